@@ -0,0 +1,95 @@
+import logging
+from pprint import pprint
+
+from pyqtgraph.Qt import QtCore, QtGui
+
+__all__ = ['MonitorTableModel']
+
+
+class MonitorTableModel(QtCore.QAbstractTableModel):
+  """
+  Table model of the monitor tab, one row per (subjectId, sourceId).
+
+  Rows are looked up through a dict index, and setRows only emits
+  insert/remove/dataChanged signals for rows that actually changed.
+  The status column is colored from status_desc via the BackgroundRole.
+  """
+  def __init__(self, headers, status_desc, key_cols=(0,1), status_col=2, parent=None):
+    super().__init__(parent)
+    self.headers = list(headers)
+    self.status_desc = status_desc
+    self.key_cols = key_cols
+    self.status_col = status_col
+
+    self.rows = []
+    self.keys = []
+    self.index_of = {}
+    self.brushes = { k:QtGui.QBrush(QtGui.QColor(v["color"])) for k,v in status_desc.items() }
+
+
+  #
+  # QAbstractTableModel interface
+  #
+
+  def rowCount(self, parent=QtCore.QModelIndex()):
+    return 0 if parent.isValid() else len(self.rows)
+
+  def columnCount(self, parent=QtCore.QModelIndex()):
+    return 0 if parent.isValid() else len(self.headers)
+
+  def data(self, index, role=QtCore.Qt.DisplayRole):
+    if not index.isValid(): return None
+    value = self.rows[index.row()][index.column()]
+    if role == QtCore.Qt.DisplayRole:
+      return str(value)
+    if role == QtCore.Qt.BackgroundRole and index.column() == self.status_col:
+      return self.brushes.get(value)
+    return None
+
+  def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+    if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+      return self.headers[section]
+    return super().headerData(section, orientation, role)
+
+
+  #
+  # Row access
+  #
+
+  def key(self, row):
+    return self.keys[row]
+
+  def rowOf(self, key):
+    return self.index_of.get(key, -1)
+
+  # replaces the table content with the given rows (lists, one entry per column)
+  def setRows(self, rows):
+    new = { tuple(r[c] for c in self.key_cols):list(r) for r in rows }
+
+    # remove rows that are gone, back to front to keep indices valid
+    removed = [ i for i,k in enumerate(self.keys) if k not in new ]
+    for i in reversed(removed):
+      self.beginRemoveRows(QtCore.QModelIndex(), i, i)
+      del self.rows[i]
+      del self.keys[i]
+      self.endRemoveRows()
+    if removed:
+      self.index_of = { k:i for i,k in enumerate(self.keys) }
+
+    # update changed rows
+    for k,r in new.items():
+      i = self.index_of.get(k)
+      if i is None or self.rows[i] == r: continue
+      self.rows[i] = r
+      self.dataChanged.emit(self.index(i, 0), self.index(i, len(self.headers)-1))
+
+    # append new rows
+    added = [ (k,r) for k,r in new.items() if k not in self.index_of ]
+    if added:
+      first = len(self.rows)
+      self.beginInsertRows(QtCore.QModelIndex(), first, first + len(added) - 1)
+      for k,r in added:
+        self.index_of[k] = len(self.rows)
+        self.keys.append(k)
+        self.rows.append(r)
+      self.endInsertRows()
@@ -1,23 +1,35 @@
-import time, datetime
+import time, datetime, calendar
+import itertools
 import collections
 import logging
 from pprint import pprint
 
-__all__ = ['RadarDataBufferError','RDBTypeError','RadarDataBuffer','RadarSensorMeta']
+import numpy as np
+
+from .radar_ring_buffer import RadarRingBuffer
+from .radar_rollup import RadarRollup
+from .radar_status import RadarStatusTable
+
+__all__ = ['RadarDataBufferError','RDBTypeError','RadarDataBuffer','RadarSensorMeta','getSensorFields','parseStamps']
 
 
 sourceTypes = ["ANDROID", "EMPATICA", "PEBBLE", "BIOVOTION"]
 sensorTypes = ["ACCELEROMETER", "BATTERY", "BLOOD_VOLUME_PULSE", "ELECTRODERMAL_ACTIVITY", "INTER_BEAT_INTERVAL", "HEART_RATE", "THERMOMETER"]
 
+# value fields of a sample per sensor type, sensors not listed here have a single "value" field
+sensorFields = {"ACCELEROMETER": ["x", "y", "z"]}
+
 status_desc = {
-                "GOOD": {"priority": 1, "th_min": 0, "th_bat": 0.25, "color": "lightgreen"},
-                "OK": {"priority": 2, "th_min": 2, "th_bat": 0.10, "color": "moccasin"},
-                "WARNING": {"priority": 3, "th_min": 3, "th_bat": 0.05, "color": "orange"},
-                "CRITICAL": {"priority": 4, "th_min": 5, "th_bat": 0, "color": "red"},
-                "DISCONNECTED": {"priority": 0, "th_min": 10, "th_bat": -1, "color": "transparent"},
-                "N/A": {"priority": -1, "th_min": -1, "th_bat": -1, "color": "lightgrey"}
+                "GOOD": {"priority": 1, "th_min": 0, "th_bat": 0.25, "poll": 1, "color": "lightgreen"},
+                "OK": {"priority": 2, "th_min": 2, "th_bat": 0.10, "poll": 1, "color": "moccasin"},
+                "WARNING": {"priority": 3, "th_min": 3, "th_bat": 0.05, "poll": 2, "color": "orange"},
+                "CRITICAL": {"priority": 4, "th_min": 5, "th_bat": 0, "poll": 4, "color": "red"},
+                "DISCONNECTED": {"priority": 0, "th_min": 10, "th_bat": -1, "poll": 30, "color": "transparent"},
+                "N/A": {"priority": -1, "th_min": -1, "th_bat": -1, "poll": 1, "color": "lightgrey"}
               }
 
+status_table = RadarStatusTable(status_desc)
+
 datastampformat = "%Y-%m-%dT%H:%M:%SZ"
 utcOffset = time.timezone - (time.daylight * 3600)
 
@@ -38,50 +50,311 @@ class RDBMetaError(RadarDataBufferError):
     self.sensor = sensor
 
 
+def getSensorFields(sensorType):
+  return sensorFields.get(sensorType, ["value"])
+
+# converts a sample stamp string to epoch seconds (UTC)
+def parseStamp(stamp):
+  return calendar.timegm(time.strptime(stamp, datastampformat))
+
+# converts a list of sample stamp strings to an array of epoch seconds (UTC).
+# Stamps are fixed-width (YYYY-mm-ddTHH:MM:SSZ), so the digits are read directly
+# from the byte matrix instead of calling strptime per stamp.
+# Stamps that do not match the format (separators, digits or field ranges) are parsed with parseStamp.
+def parseStamps(stamps):
+  if len(stamps) == 0:
+    return np.empty(0, dtype=np.float64)
+  try:
+    raw = np.array(stamps, dtype="S20")
+  except UnicodeEncodeError:
+    raw = None
+  if raw is None or any(len(s) != 20 for s in stamps):
+    return np.array([ parseStamp(s) for s in stamps ], dtype=np.float64)
+
+  chars = raw.view(np.uint8).reshape(-1, 20)
+  digits = chars[:, _stampDigitPos].astype(np.int64) - ord("0")
+  valid = (chars[:, _stampSepPos] == _stampSepChars).all(axis=1) & ((digits >= 0) & (digits <= 9)).all(axis=1)
+  digits = np.where(valid[:, None], digits, 0)
+  def num(a, b):
+    n = np.zeros(len(digits), dtype=np.int64)
+    for i in range(a, b): n = n * 10 + digits[:, _stampDigitIdx[i]]
+    return n
+
+  month, day, hour, minute, second = num(5, 7), num(8, 10), num(11, 13), num(14, 16), num(17, 19)
+  valid &= (month >= 1) & (month <= 12) & (day >= 1) & (hour <= 23) & (minute <= 59) & (second <= 59)
+  month = np.where(valid, month, 1)
+  day = np.where(valid, day, 1)
+  months = (num(0, 4) - 1970).astype("datetime64[Y]").astype("datetime64[M]") + (month - 1).astype("timedelta64[M]")
+  days = months.astype("datetime64[D]") + (day - 1).astype("timedelta64[D]")
+  # days past the end of the month roll over into the next one
+  valid &= days.astype("datetime64[M]") == months
+  secs = (days.astype(np.int64) * 86400 + hour * 3600 + minute * 60 + second).astype(np.float64)
+  for i in np.flatnonzero(~valid):
+    secs[i] = parseStamp(stamps[i])
+  return secs
+
+def formatStamp(stamp):
+  return time.strftime(datastampformat, time.gmtime(stamp))
+
+# index of the first sample whose stamp is >= stamp (samples sorted by time).
+# Stamps are fixed-width ISO strings, so they can be compared without parsing.
+def bisectSamples(samples, stamp):
+  lo, hi = 0, len(samples)
+  while lo < hi:
+    mid = (lo + hi) // 2
+    if samples[mid]["startDateTime"] < stamp: lo = mid + 1
+    else: hi = mid
+  return lo
+
+_stampSepPos = [4, 7, 10, 13, 16, 19]
+_stampSepChars = np.array([ ord(c) for c in "--T::Z" ], dtype=np.uint8)
+_stampDigitPos = [ i for i in range(19) if i not in _stampSepPos ]
+# column of a stamp character in the digit matrix
+_stampDigitIdx = { p:i for i,p in enumerate(_stampDigitPos) }
+
+def toFloat(value):
+  try:
+    return float(value)
+  except (TypeError, ValueError):
+    return np.nan
+
+
 class RadarDataBuffer(object):
-  def __init__(self, sourceType, sensors=sensorTypes, maxlen=None):
+  def __init__(self, sourceType, sensors=sensorTypes, maxlen=None, columnar=False):
     self.sourceType = sourceType
     self.sensors = sensors
     self.maxlen = maxlen
+    self.columnar = columnar
     self.checkType(self.sourceType, sourceTypes)
 
     self.meta = { k:RadarSensorMeta(k) for k in self.sensors }
-    self.buffer = { k:collections.deque(maxlen=self.maxlen) for k in self.sensors }
+    # incremented on every change of a sensor's data, used to detect stale snapshots
+    self.version = { k:0 for k in self.sensors }
+    if self.columnar:
+      # grown on demand, a fleet of mostly idle sources must not allocate 2*maxlen rows per sensor up front
+      self.buffer = { k:RadarRingBuffer(["stamp"] + getSensorFields(k), maxlen=self.maxlen, prealloc=False) for k in self.sensors }
+    else:
+      self.buffer = { k:collections.deque(maxlen=self.maxlen) for k in self.sensors }
+      # epoch seconds of the samples in buffer, parsed once at ingest and kept in a contiguous array for binary search
+      self.stamps = { k:RadarRingBuffer(["stamp"], maxlen=self.maxlen, prealloc=False) for k in self.sensors }
+    # min/max/mean/count rollups at 1min, 10min, 1h and 1d, updated on ingest
+    self.rollups = { k:RadarRollup(getSensorFields(k)) for k in self.sensors }
 
 
   def checkType(self, type, allowed):
     if type not in allowed:
       raise RDBTypeError(type, allowed)
 
+  # converts raw json samples to rows for the columnar backend, values as returned by toValues if already converted
+  def toRows(self, sensorType, samples, stamps, values=None):
+    if values is None: values = self.toValues(sensorType, samples)
+    rows = np.empty(len(samples), dtype=self.buffer[sensorType].dtype)
+    rows["stamp"] = stamps
+    for f,v in values.items():
+      rows[f] = v
+    return rows
+
+  # appends epoch stamps to the stamp column of the deque backend
+  def addStamps(self, sensorType, stamps):
+    rows = np.empty(len(stamps), dtype=self.stamps[sensorType].dtype)
+    rows["stamp"] = stamps
+    self.stamps[sensorType].extend(rows)
+
+  # converts raw json samples to a dict of field -> value array
+  def toValues(self, sensorType, samples):
+    return { f:np.array([ toFloat(d["sample"].get(f)) for d in samples ], dtype=np.float64) for f in getSensorFields(sensorType) }
+
   def addSample(self, sensorType, sample):
-    self.checkType(sensorType, self.sensors)
-    self.buffer[sensorType].append(sample)
-    self.updateMeta()
+    self.addSamples(sensorType, [sample])
 
   def addSamples(self, sensorType, samples):
     self.checkType(sensorType, self.sensors)
-    self.buffer[sensorType].extend(samples)
-    self.updateMeta()
+    stamps = parseStamps([ d["startDateTime"] for d in samples ])
+    values = self.toValues(sensorType, samples)
+    if self.columnar:
+      self.buffer[sensorType].extend(self.toRows(sensorType, samples, stamps, values))
+    else:
+      self.buffer[sensorType].extend(samples)
+      self.addStamps(sensorType, stamps)
+    self.rollups[sensorType].add(stamps, values)
+    self.version[sensorType] += 1
+    self.updateMeta(sensorType)
 
   def replaceSamples(self, sensorType, samples):
     self.checkType(sensorType, self.sensors)
     self.buffer[sensorType].clear()
-    self.buffer[sensorType].extend(samples)
-    self.updateMeta()
+    if not self.columnar: self.stamps[sensorType].clear()
+    self.rollups[sensorType].clear()
+    self.addSamples(sensorType, samples)
+
+  # merges a (time sorted) response into the buffer: samples newer than the buffer are appended,
+  # samples matching one of the last `overlap` buffered stamps overwrite them in place (late corrections),
+  # samples within that tail whose stamp is not buffered yet (late windows) are inserted,
+  # everything older is skipped without being parsed.
+  # Appended samples are folded into the rollups, overwrites and insertions rebuild them from the first changed stamp on.
+  # Returns the (start, end) epoch range that changed, or None if nothing changed.
+  def mergeSamples(self, sensorType, samples, overlap=1):
+    self.checkType(sensorType, self.sensors)
+    buf = self.buffer[sensorType]
+    if len(samples) == 0: return None
+    if len(buf) == 0:
+      self.addSamples(sensorType, samples)
+      return (self.getFirstStamp(sensorType), self.getLastStamp(sensorType))
+
+    overlap = max(1, min(overlap, len(buf)))
+    tail_stamps = self.getStamps(sensorType)[-overlap:]
+    samples = samples[bisectSamples(samples, formatStamp(tail_stamps[0])):]
+    if len(samples) == 0: return None
+    stamps = parseStamps([ d["startDateTime"] for d in samples ])
+
+    changed = []
+    overwritten = []
 
-  def updateMeta(self):
-    for s in self.sensors:
-      self.meta[s].update(len(self.buffer[s]), self.getLastSample(s))
+    # samples not newer than the buffer, either buffered already or missing from the tail
+    n_old = int(np.searchsorted(stamps, tail_stamps[-1], side="right"))
+    pos = np.searchsorted(tail_stamps, stamps[:n_old])
+    found = tail_stamps[np.minimum(pos, overlap - 1)] == stamps[:n_old]
+    missing = np.flatnonzero(~found)
+    n_found = int(missing[0]) if len(missing) > 0 else n_old
 
+    # overwrite matching stamps of the tail, up to the first missing one
+    for i in range(n_found):
+      idx = len(buf) + int(pos[i]) - overlap
+      if self.columnar:
+        row = self.toRows(sensorType, samples[i:i+1], stamps[i:i+1])[0]
+        if np.array_equal(np.array(buf.view()[idx].tolist()), np.array(row.tolist()), equal_nan=True): continue
+        buf.view()[idx] = row
+      else:
+        if buf[idx] == samples[i]: continue
+        buf[idx] = samples[i]
+      changed.append(stamps[i])
+      overwritten.append(stamps[i])
+
+    if len(missing) > 0:
+      # insert late samples: everything from the first missing stamp on is merged and appended again
+      self.spliceSamples(sensorType, len(buf) + int(pos[n_found]) - overlap, samples[n_found:], stamps[n_found:])
+      changed.extend([stamps[n_found], stamps[-1]])
+      overwritten.append(stamps[n_found])
+    elif n_old < len(samples):
+      # append new samples
+      new_samples, new_stamps = samples[n_old:], stamps[n_old:]
+      new_values = self.toValues(sensorType, new_samples)
+      if self.columnar:
+        buf.extend(self.toRows(sensorType, new_samples, new_stamps, new_values))
+      else:
+        buf.extend(new_samples)
+        self.addStamps(sensorType, new_stamps)
+      if len(overwritten) == 0: self.rollups[sensorType].add(new_stamps, new_values)
+      changed.extend([new_stamps[0], new_stamps[-1]])
+
+    if len(changed) == 0: return None
+    if len(overwritten) > 0:
+      rollup = self.rollups[sensorType]
+      since = rollup.startOfBucket(min(overwritten))
+      rollup.rebuild(min(overwritten), self.getStamps(sensorType, since), { f:self.getValues(sensorType, f, since) for f in getSensorFields(sensorType) })
+    self.version[sensorType] += 1
+    self.updateMeta(sensorType)
+    return (float(min(changed)), float(max(changed)))
+
+  # replaces the buffered samples from index `cut` on by their merge with time sorted samples/stamps,
+  # samples win over buffered ones with the same stamp
+  def spliceSamples(self, sensorType, cut, samples, stamps):
+    buf = self.buffer[sensorType]
+    old_stamps = np.array(self.getStamps(sensorType)[cut:])
+    keep = ~np.isin(old_stamps, stamps)
+    merged_stamps = np.concatenate((old_stamps[keep], stamps))
+    order = np.argsort(merged_stamps, kind="stable")
+    if self.columnar:
+      rows = np.concatenate((buf.view()[cut:][keep], self.toRows(sensorType, samples, stamps)))
+      buf.truncate(cut)
+      buf.extend(rows[order])
+    else:
+      old = self.slice(buf, cut, len(buf))
+      merged = [ old[i] for i in np.flatnonzero(keep) ] + list(samples)
+      for i in range(len(buf) - cut): buf.pop()
+      buf.extend([ merged[i] for i in order ])
+      self.stamps[sensorType].truncate(cut)
+      self.addStamps(sensorType, merged_stamps[order])
+
+  # recomputes the meta data of the given sensor, or of all sensors
+  def updateMeta(self, sensorType=None):
+    for s in ([sensorType] if sensorType else self.sensors):
+      self.meta[s].update(len(self.buffer[s]), self.getLastStamp(s), self.getLastValue(s, getSensorFields(s)[0]))
+
+  # returns the last raw json sample, or the last row (record) in columnar mode
   def getLastSample(self, sensorType):
     self.checkType(sensorType, self.sensors)
     if len(self.buffer[sensorType]) < 1:
       return None
     return self.buffer[sensorType][-1]
 
-  def getSamples(self, sensorType):
+  # index range [lo, hi) of the samples with start <= stamp <= end (epoch seconds, None is unbounded),
+  # found by binary search on the sorted stamp array (O(log n) in both backends)
+  def getRange(self, sensorType, start=None, end=None):
+    self.checkType(sensorType, self.sensors)
+    stamps = (self.buffer[sensorType] if self.columnar else self.stamps[sensorType]).column("stamp")
+    lo = 0 if start is None else int(np.searchsorted(stamps, start, side="left"))
+    hi = len(stamps) if end is None else int(np.searchsorted(stamps, end, side="right"))
+    return lo, max(lo, hi)
+
+  # samples within [start, end] (all by default).
+  # returns the deque of raw json samples (a list of the window if a range is given),
+  # or a structured array view of the window in columnar mode
+  def getSamples(self, sensorType, start=None, end=None):
+    self.checkType(sensorType, self.sensors)
+    if self.columnar:
+      lo, hi = self.getRange(sensorType, start, end)
+      return self.buffer[sensorType].view()[lo:hi]
+    if start is None and end is None:
+      return self.buffer[sensorType]
+    return self.slice(self.buffer[sensorType], *self.getRange(sensorType, start, end))
+
+  # epoch seconds (UTC) of the samples within [start, end]
+  def getStamps(self, sensorType, start=None, end=None):
+    self.checkType(sensorType, self.sensors)
+    lo, hi = self.getRange(sensorType, start, end)
+    return (self.buffer[sensorType] if self.columnar else self.stamps[sensorType]).column("stamp")[lo:hi]
+
+  # values of one field of the samples within [start, end], e.g. "value" or "x"
+  def getValues(self, sensorType, field="value", start=None, end=None):
     self.checkType(sensorType, self.sensors)
-    return self.buffer[sensorType]
+    lo, hi = self.getRange(sensorType, start, end)
+    if self.columnar:
+      return self.buffer[sensorType].column(field)[lo:hi]
+    return np.array([ toFloat(d["sample"].get(field)) for d in self.slice(self.buffer[sensorType], lo, hi) ], dtype=np.float64)
+
+  # items [lo, hi) of a deque, iterating from whichever end is closer
+  def slice(self, dq, lo, hi):
+    if lo == 0 and hi == len(dq): return list(dq)
+    if lo < len(dq) - hi: return list(itertools.islice(dq, lo, hi))
+    return list(itertools.islice(reversed(dq), len(dq) - hi, len(dq) - lo))[::-1]
+
+  def getFirstStamp(self, sensorType):
+    self.checkType(sensorType, self.sensors)
+    if len(self.buffer[sensorType]) < 1: return None
+    return float((self.buffer[sensorType] if self.columnar else self.stamps[sensorType])[0]["stamp"])
+
+  def getLastStamp(self, sensorType):
+    last = self.getLastSample(sensorType)
+    if last is None: return None
+    if self.columnar: return float(last["stamp"])
+    return float(self.stamps[sensorType].last()["stamp"])
+
+  # value of one field of the last sample, None if there is none or the sensor has no such field
+  def getLastValue(self, sensorType, field="value"):
+    last = self.getLastSample(sensorType)
+    if last is None: return None
+    if self.columnar: return float(last[field]) if field in last.dtype.names else None
+    return last["sample"].get(field)
+
+  # the multi-resolution aggregates of a sensor, see RadarRollup
+  def getRollup(self, sensorType):
+    self.checkType(sensorType, self.sensors)
+    return self.rollups[sensorType]
+
+  def getVersion(self, sensorType):
+    self.checkType(sensorType, self.sensors)
+    return self.version[sensorType]
 
   def getBuffer(self):
     return self.buffer
@@ -93,42 +366,52 @@ class RadarDataBuffer(object):
   def getStatusDesc(self):
     return status_desc
 
+  def getStatusTable(self):
+    return status_table
+
 
 class RadarSensorMeta(object):
+  """
+  Meta data of one sensor buffer.
+  update() only caches the sample count and the last stamp/value, the time
+  dependent diff and status are derived from them whenever they are read.
+  """
   def __init__(self, sensorType):
     self.sensorType = sensorType
 
     self.num_samples = 0
-    self.last_sample = None
+    self.last_value = None
+    self.last_epoch = None
     self.last_stamp = "N/A"
-    self.diff = "N/A"
-    self.status = "N/A"
 
-  def update(self, num_samples, last_sample):
+  # last_stamp in epoch seconds (UTC), last_value is the first value field of the last sample
+  def update(self, num_samples, last_stamp, last_value):
     self.num_samples = num_samples
-    self.last_sample = last_sample
+    self.last_value = last_value
 
-    if self.num_samples < 1 or self.last_sample is None: return
+    if self.num_samples < 1 or last_stamp is None:
+      self.last_epoch = None
+      self.last_stamp = "N/A"
+      return
 
     # update last stamp
-    self.last_stamp = datetime.datetime.strptime(self.last_sample["startDateTime"], datastampformat)
+    if last_stamp != self.last_epoch:
+      self.last_epoch = last_stamp
+      self.last_stamp = datetime.datetime.utcfromtimestamp(last_stamp)
 
-    # update time diff
-    now = datetime.datetime.utcnow()
-    diff = now - self.last_stamp
+  # time since the last sample
+  @property
+  def diff(self):
+    if self.last_epoch is None: return "N/A"
+    diff = datetime.datetime.utcnow() - self.last_stamp
     if diff < datetime.timedelta():
       diff = datetime.timedelta()
-    self.diff = diff
+    return diff
+
+  @property
+  def status(self):
+    if self.num_samples < 1 or self.last_epoch is None: return "N/A"
 
-    # update status
     if self.sensorType == "BATTERY":
-      bat = self.last_sample["sample"]["value"]
-      for st in sorted(status_desc.items(), key=lambda x: x[1]['th_bat']):
-        th = st[1]["th_bat"]
-        if th >= 0 and bat > th:
-          self.status = st[0]
-    else:
-      for st in sorted(status_desc.items(), key=lambda x: x[1]['th_min']):
-        th = st[1]["th_min"]
-        if th >= 0 and self.diff >= datetime.timedelta(minutes=th):
-          self.status = st[0]
+      return status_table.batteryStatus(self.last_value)
+    return status_table.timeStatus(max(time.time() - self.last_epoch, 0))
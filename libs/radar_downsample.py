@@ -0,0 +1,41 @@
+import logging
+from pprint import pprint
+
+import numpy as np
+
+__all__ = ['decimateMinMax']
+
+
+# reduces a sorted series to the samples within [start, end] and, if there are more than 2*bins of them,
+# to the min and max sample of each of `bins` equally wide time bins (in time order).
+# bins are aligned to multiples of their width, so the same data gives the same points while the window moves.
+# NaN values are dropped. returns (stamps, values)
+def decimateMinMax(stamps, values, start, end, bins):
+  lo = np.searchsorted(stamps, start, side="left")
+  hi = np.searchsorted(stamps, end, side="right")
+  x = stamps[lo:hi]
+  y = values[lo:hi]
+  valid = ~np.isnan(y)
+  if not valid.all():
+    x = x[valid]
+    y = y[valid]
+  if len(x) <= 2 * bins or end <= start:
+    return x, y
+
+  width = (end - start) / float(bins)
+  b = np.floor(x / width).astype(np.int64)
+
+  # bins are non-decreasing since stamps are sorted, reduce each bin segment to its min/max
+  starts = np.flatnonzero(np.concatenate(([True], b[1:] != b[:-1])))
+  counts = np.diff(np.concatenate((starts, [len(b)])))
+  idx = np.concatenate((firstMatch(y == np.repeat(np.minimum.reduceat(y, starts), counts), b),
+                        firstMatch(y == np.repeat(np.maximum.reduceat(y, starts), counts), b)))
+  idx = np.unique(idx)
+  return x[idx], y[idx]
+
+
+# index of the first True entry of mask in each group of (non-decreasing) group ids
+def firstMatch(mask, groups):
+  nz = np.flatnonzero(mask)
+  g = groups[nz]
+  return nz[np.concatenate(([True], g[1:] != g[:-1]))]
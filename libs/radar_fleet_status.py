@@ -0,0 +1,106 @@
+import time
+import threading
+import collections
+import logging
+from pprint import pprint
+
+import numpy as np
+
+__all__ = ['RadarFleetStatus','RadarFleetSnapshot']
+
+
+# statuses of all sources at one point in time:
+# keys[i] is the (subjectID, sourceID) of row i, codes is a (sources x sensors) matrix of status codes,
+# prio holds the aggregated status code per source and battery the last battery level (NaN if unknown)
+RadarFleetSnapshot = collections.namedtuple("RadarFleetSnapshot", ["time", "keys", "sensors", "codes", "prio", "battery"])
+
+
+class RadarFleetStatus(object):
+  """
+  Dense status state of all sources.
+
+  Keeps a (sources x sensors) matrix of last sample stamps (epoch seconds)
+  and a vector of battery levels, updated on ingest. evaluate() derives the
+  status of every sensor and the aggregated status of every source with a
+  few numpy operations on these arrays.
+  """
+  def __init__(self, sensors, status_table, battery_sensor="BATTERY", capacity=64):
+    self.sensors = list(sensors)
+    self.sensor_idx = { s:i for i,s in enumerate(self.sensors) }
+    self.status_table = status_table
+    self.battery_col = self.sensor_idx.get(battery_sensor)
+
+    self.keys = []
+    self.rows = {}
+    self.stamps = np.full((capacity, len(self.sensors)), np.nan)
+    self.battery = np.full(capacity, np.nan)
+    self.lock = threading.Lock()
+
+  def __len__(self):
+    return len(self.keys)
+
+  def __contains__(self, key):
+    return tuple(key) in self.rows
+
+  def add(self, key):
+    key = tuple(key)
+    with self.lock:
+      if key in self.rows: return
+      if len(self.keys) == len(self.battery):
+        self.stamps = np.vstack([ self.stamps, np.full(self.stamps.shape, np.nan) ])
+        self.battery = np.concatenate([ self.battery, np.full(self.battery.shape, np.nan) ])
+      row = len(self.keys)
+      self.rows[key] = row
+      self.keys.append(key)
+      self.stamps[row] = np.nan
+      self.battery[row] = np.nan
+
+  # removes a source by moving the last row into its place
+  def remove(self, key):
+    key = tuple(key)
+    with self.lock:
+      row = self.rows.pop(key, None)
+      if row is None: return
+      last = len(self.keys) - 1
+      if row != last:
+        self.keys[row] = self.keys[last]
+        self.rows[self.keys[row]] = row
+        self.stamps[row] = self.stamps[last]
+        self.battery[row] = self.battery[last]
+      self.keys.pop()
+
+  def sync(self, keys):
+    keys = [ tuple(k) for k in keys ]
+    wanted = set(keys)
+    for k in [ k for k in self.keys if k not in wanted ]:
+      self.remove(k)
+    for k in keys:
+      self.add(k)
+
+  # last_stamp in epoch seconds or None, battery only used for the battery sensor
+  def update(self, key, sensorType, last_stamp, battery=None):
+    with self.lock:
+      row = self.rows.get(tuple(key))
+      if row is None: return
+      self.stamps[row, self.sensor_idx[sensorType]] = np.nan if last_stamp is None else last_stamp
+      if self.sensor_idx[sensorType] == self.battery_col:
+        self.battery[row] = np.nan if battery is None or last_stamp is None else battery
+
+  def evaluate(self, now=None):
+    if now is None: now = time.time()
+    with self.lock:
+      n = len(self.keys)
+      keys = list(self.keys)
+      stamps = self.stamps[:n].copy()
+      battery = self.battery[:n].copy()
+
+    codes = self.status_table.stampStatusCodes(stamps, now)
+    if self.battery_col is not None:
+      codes[:, self.battery_col] = self.status_table.batteryStatusCodes(battery)
+    prio = self.status_table.prioStatusCodes(codes) if n > 0 else np.empty(0, dtype=codes.dtype)
+    return RadarFleetSnapshot(now, keys, self.sensors, codes, prio, battery)
+
+  # boolean mask of the sources of a snapshot to show, all or only those with status priority > 0
+  def filter(self, snapshot, view_all=False):
+    if view_all: return np.ones(len(snapshot.keys), dtype=bool)
+    return self.status_table.priority[snapshot.prio] > 0
@@ -1,13 +1,27 @@
 import logging
+import threading
+import collections
 from pprint import pprint
 
-from .radar_data_buffer import RadarDataBuffer
+import numpy as np
 
-__all__ = ['RadarPatientSource']
+from .radar_data_buffer import RadarDataBuffer, getSensorFields
+from .radar_downsample import decimateMinMax
+from .radar_series_file import writeSeries, seriesPath
+
+__all__ = ['RadarPatientSource','RadarSourceSnapshot','RadarSeriesSnapshot','RadarPlotSeries']
+
+
+# immutable summary of a source for one sensor, last_values holds one value per sensor field (or None)
+RadarSourceSnapshot = collections.namedtuple("RadarSourceSnapshot", ["subjectID", "sourceID", "prio_status", "battery", "last_stamp", "diff", "last_values", "version"])
+# read-only copy of one sensor series, values maps sensor field -> array
+RadarSeriesSnapshot = collections.namedtuple("RadarSeriesSnapshot", ["version", "stamps", "values"])
+# decimated series for plotting, curves maps sensor field -> (stamps, values), copies that stay valid after later writes
+RadarPlotSeries = collections.namedtuple("RadarPlotSeries", ["version", "start", "end", "bins", "curves"])
 
 
 class RadarPatientSource(object):
-  def __init__(self, subjectID, sourceID, sourceType="EMPATICA", bufferlen=None):
+  def __init__(self, subjectID, sourceID, sourceType="EMPATICA", bufferlen=None, columnar=False):
     self.subjectID = subjectID
     self.sourceID = sourceID
     self.sourceType = sourceType
@@ -17,7 +31,13 @@ class RadarPatientSource(object):
     self.latest_diff = "N/A"
     self.battery = "N/A"
 
-    self.data_buf = RadarDataBuffer(self.sourceType, maxlen=bufferlen)
+    self.data_buf = RadarDataBuffer(self.sourceType, maxlen=bufferlen, columnar=columnar)
+    self.series = {}
+    self.plot_series = {}
+    # data version of each sensor at its last export
+    self.exported = {}
+    # guards data_buf, held by writers and while taking snapshots
+    self.lock = threading.RLock()
 
   #
   # operator== overload
@@ -38,8 +58,17 @@ class RadarPatientSource(object):
   def getLastSample(self, sensorType):
     return self.data_buf.getLastSample(sensorType)
 
-  def getSamples(self, sensorType):
-    return self.data_buf.getSamples(sensorType)
+  def getSamples(self, sensorType, start=None, end=None):
+    return self.data_buf.getSamples(sensorType, start, end)
+
+  def getStamps(self, sensorType, start=None, end=None):
+    return self.data_buf.getStamps(sensorType, start, end)
+
+  def getValues(self, sensorType, field="value", start=None, end=None):
+    return self.data_buf.getValues(sensorType, field, start, end)
+
+  def getLastValue(self, sensorType, field="value"):
+    return self.data_buf.getLastValue(sensorType, field)
 
 
   #
@@ -56,9 +85,9 @@ class RadarPatientSource(object):
     return self.data_buf.getMeta(sensorType).diff
 
   def getBattery(self):
-    if self.data_buf.getMeta("BATTERY").last_sample is None:
+    if self.data_buf.getMeta("BATTERY").last_value is None:
       return "N/A"
-    return self.data_buf.getMeta("BATTERY").last_sample["sample"]["value"]
+    return self.data_buf.getMeta("BATTERY").last_value
 
 
   #
@@ -66,10 +95,7 @@ class RadarPatientSource(object):
   #
 
   def getPrioStatus(self):
-    statuses = [ self.getStatus(s) for s in self.data_buf.sensors ]
-    statuses = sorted(statuses, key=lambda x: self.data_buf.getStatusDesc()[x]['priority'])
-    if "DISCONNECTED" in statuses: return "DISCONNECTED"
-    return statuses[-1]
+    return self.data_buf.getStatusTable().prioStatus([ self.getStatus(s) for s in self.data_buf.sensors ])
 
   def getLatestStamp(self):
     stamps = [ self.getLastStamp(s) for s in self.data_buf.sensors ]
@@ -79,3 +105,82 @@ class RadarPatientSource(object):
 
   def getBufferLengths(self):
     return [ self.data_buf.getMeta(s).num_samples for s in self.data_buf.sensors ]
+
+
+  #
+  # Snapshots
+  #
+
+  # prio_status can be passed in if already known (e.g. from a fleet evaluation)
+  def getSnapshot(self, sensorType, prio_status=None):
+    last_values = None
+    if self.getLastSample(sensorType) is not None:
+      last_values = tuple( self.getLastValue(sensorType, f) for f in getSensorFields(sensorType) )
+    if prio_status is None: prio_status = self.getPrioStatus()
+    return RadarSourceSnapshot(self.subjectID, self.sourceID, prio_status, self.getBattery(),
+                               self.getLastStamp(sensorType), self.getDiff(sensorType), last_values,
+                               self.data_buf.getVersion(sensorType))
+
+  # copies the series once per data version, later calls return the cached copy
+  def getSeries(self, sensorType):
+    version = self.data_buf.getVersion(sensorType)
+    series = self.series.get(sensorType)
+    if series is not None and series.version == version:
+      return series
+
+    stamps = np.array(self.getStamps(sensorType), dtype=np.float64)
+    values = { f:np.array(self.getValues(sensorType, f), dtype=np.float64) for f in getSensorFields(sensorType) }
+    for a in [stamps] + list(values.values()):
+      a.flags.writeable = False
+    series = RadarSeriesSnapshot(version, stamps, values)
+    self.series[sensorType] = series
+    return series
+
+  # writes all sensor series that changed since the last export as memory-mappable files below directory,
+  # see radar_series_file. info is added to the json index of each series. returns the number of written series
+  def exportSeries(self, directory, info=None):
+    written = 0
+    for s in self.data_buf.sensors:
+      with self.lock:
+        version = self.data_buf.getVersion(s)
+        if self.exported.get(s) == version or self.data_buf.getMeta(s).num_samples < 1: continue
+        series = self.getSeries(s)
+      index = dict(info or {}, subjectId=self.subjectID, sourceId=self.sourceID, sensor=s, version=version)
+      writeSeries(seriesPath(directory, self.subjectID, self.sourceID, s), series.stamps, series.values, index)
+      self.exported[s] = version
+      written += 1
+    return written
+
+  # min/max decimated series within [start, end] with at most 2*bins points per curve,
+  # cached per (sensorType, zoom) until new data arrives or the bin grid window or number of bins changes.
+  # the window is snapped outward to multiples of the bin width, so a window that moves by less than a bin reuses the cached series.
+  # zoomed out far enough, the bucket min/max of the coarsest rollup level not wider than a bin are decimated instead of the raw samples
+  def getPlotSeries(self, sensorType, start, end, bins, zoom=None):
+    width = (end - start) / float(bins)
+    n = bins
+    if width > 0:
+      start, end = float(np.floor(start / width) * width), float(np.ceil(end / width) * width)
+      n = max(int(round((end - start) / width)), 1)
+
+    version = self.data_buf.getVersion(sensorType)
+    plot = self.plot_series.get((sensorType, zoom))
+    if plot is not None and (plot.version, plot.bins, plot.start, plot.end) == (version, bins, start, end):
+      return plot
+
+    rollup = self.data_buf.getRollup(sensorType)
+    w = rollup.levelFor(width)
+    if w is not None:
+      buckets = rollup.getBuckets(w, start, end)
+      curves = {}
+      for f in getSensorFields(sensorType):
+        b = buckets[buckets[f+"_count"] > 0]
+        curves[f] = decimateMinMax(np.repeat(b["stamp"] + w / 2., 2), np.column_stack((b[f+"_min"], b[f+"_max"])).ravel(), start, end, n)
+    else:
+      # only the samples within the window are read
+      stamps = self.getStamps(sensorType, start, end)
+      curves = { f:decimateMinMax(stamps, self.getValues(sensorType, f, start, end), start, end, n) for f in getSensorFields(sensorType) }
+    # few enough samples are returned as views into the (columnar) buffer, which are only valid until its next write
+    curves = { f:(np.array(x), np.array(y)) for f,(x,y) in curves.items() }
+    plot = RadarPlotSeries(version, start, end, bins, curves)
+    self.plot_series[(sensorType, zoom)] = plot
+    return plot
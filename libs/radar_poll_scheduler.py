@@ -0,0 +1,84 @@
+import time
+import heapq
+import threading
+import logging
+from pprint import pprint
+
+__all__ = ['RadarPollScheduler']
+
+
+class RadarPollScheduler(object):
+  """
+  Priority queue of poll keys (e.g. (subjectId, sourceId, sensor)) by next due time.
+
+  pop() hands out the key that is due first, limited to `rate` keys per second
+  overall (token bucket of size `burst`, unlimited if rate is None); the caller
+  reschedules each key with its own period. Keys removed by sync() are
+  dropped lazily when they reach the top of the heap.
+  """
+  def __init__(self, rate=None, burst=1):
+    self.rate = rate
+    self.burst = max(1, burst)
+    self.tokens = float(self.burst)
+    self.stamp = time.time()
+
+    self.heap = []
+    self.due = {}
+    self.seq = 0
+    self.lock = threading.Lock()
+
+  def __len__(self):
+    return len(self.due)
+
+  def __contains__(self, key):
+    return key in self.due
+
+  def schedule(self, key, due):
+    with self.lock:
+      self.push(key, due)
+
+  def push(self, key, due):
+    self.due[key] = due
+    self.seq += 1
+    heapq.heappush(self.heap, (due, self.seq, key))
+
+  # makes the scheduled keys equal to `keys`, new keys are due at `now`
+  def sync(self, keys, now=None):
+    if now is None: now = time.time()
+    keys = set(keys)
+    with self.lock:
+      for k in [ k for k in self.due if k not in keys ]:
+        del self.due[k]
+      for k in keys:
+        if k not in self.due: self.push(k, now)
+
+  # makes all keys due at `now`
+  def reset(self, now=None):
+    if now is None: now = time.time()
+    with self.lock:
+      keys = list(self.due.keys())
+      self.heap = []
+      self.due = {}
+      for k in keys: self.push(k, now)
+
+  # returns (key, 0) for the next due key, or (None, seconds to wait) if no key is due or the rate budget is used up.
+  # a returned key is removed until it is scheduled again.
+  def pop(self, now=None):
+    if now is None: now = time.time()
+    with self.lock:
+      # drop stale heap entries (removed or rescheduled keys)
+      while self.heap and self.due.get(self.heap[0][2]) != self.heap[0][0]:
+        heapq.heappop(self.heap)
+      if not self.heap: return None, float("inf")
+
+      wait = self.heap[0][0] - now
+      if self.rate:
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        wait = max(wait, (1. - self.tokens) / self.rate)
+      if wait > 0: return None, wait
+
+      due, seq, key = heapq.heappop(self.heap)
+      del self.due[key]
+      if self.rate: self.tokens -= 1.
+      return key, 0.
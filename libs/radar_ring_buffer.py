@@ -0,0 +1,100 @@
+import logging
+import numpy as np
+
+__all__ = ['RadarRingBuffer']
+
+
+class RadarRingBuffer(object):
+  """
+  Columnar ring buffer of float64 columns.
+
+  Rows live in a structured array of twice the capacity, so the current window
+  is always one contiguous slice and can be handed out as a view without copying.
+  When the write position hits the end, the newest rows are moved back to the
+  front (amortized O(1) per row).
+  Views are only valid until the next write; copy them if they have to survive one.
+  With prealloc=True (the default) a bounded buffer allocates its full 2*maxlen
+  rows up front, so writes never reallocate; with prealloc=False it starts at
+  `chunk` rows and grows geometrically up to that size only as data arrives,
+  which keeps many sparse buffers small at the cost of a few copies while growing.
+  """
+  def __init__(self, fields, maxlen=None, chunk=1024, prealloc=True):
+    self.fields = list(fields)
+    self.maxlen = maxlen
+    self.dtype = np.dtype([ (f, np.float64) for f in self.fields ])
+
+    size = 2 * maxlen if maxlen and prealloc else chunk
+    if maxlen: size = min(size, 2 * maxlen)
+    self._data = np.empty(size, dtype=self.dtype)
+    self._start = 0
+    self._end = 0
+
+  def __len__(self):
+    return self._end - self._start
+
+  def __getitem__(self, idx):
+    return self.view()[idx]
+
+  def __iter__(self):
+    return iter(self.view())
+
+  def clear(self):
+    self._start = 0
+    self._end = 0
+
+  # drops all but the first n rows
+  def truncate(self, n):
+    self._end = self._start + max(0, min(n, len(self)))
+
+  def append(self, row):
+    self.extend([row])
+
+  def extend(self, rows):
+    rows = np.asarray(rows, dtype=self.dtype) if not isinstance(rows, np.ndarray) or rows.dtype != self.dtype else rows
+    n = len(rows)
+    if n == 0: return
+    if self.maxlen and n > self.maxlen:
+      rows = rows[-self.maxlen:]
+      n = self.maxlen
+
+    self._reserve(n)
+    self._data[self._end:self._end+n] = rows
+    self._end += n
+    if self.maxlen and len(self) > self.maxlen:
+      self._start = self._end - self.maxlen
+
+  def _reserve(self, n):
+    if self._end + n <= len(self._data): return
+
+    if self.maxlen and len(self._data) < 2 * self.maxlen:
+      # bounded but not fully allocated yet: grow geometrically up to 2*maxlen
+      keep = min(len(self), self.maxlen - n)
+      data = np.empty(min(max(2 * len(self._data), keep + n), 2 * self.maxlen), dtype=self.dtype)
+      data[:keep] = self._data[self._end-keep:self._end]
+      self._data = data
+    elif self.maxlen:
+      # compact: move the rows that survive this write to the front
+      keep = min(len(self), self.maxlen - n)
+      self._data[:keep] = self._data[self._end-keep:self._end]
+    else:
+      # unbounded: grow geometrically
+      keep = len(self)
+      data = np.empty(max(2 * len(self._data), keep + n), dtype=self.dtype)
+      data[:keep] = self._data[self._start:self._end]
+      self._data = data
+    self._start = 0
+    self._end = keep
+
+  def view(self):
+    return self._data[self._start:self._end]
+
+  def column(self, field):
+    return self.view()[field]
+
+  def last(self):
+    if len(self) < 1:
+      return None
+    return self._data[self._end-1]
+
+  def nbytes(self):
+    return self._data.nbytes
@@ -0,0 +1,138 @@
+import logging
+from pprint import pprint
+
+import numpy as np
+
+from .radar_ring_buffer import RadarRingBuffer
+
+__all__ = ['RadarRollup','rollupLevels','rollupRetention']
+
+
+# bucket widths in seconds: 1 minute, 10 minutes, 1 hour, 1 day
+rollupLevels = [60, 600, 3600, 86400]
+# seconds of buckets kept per level: the fine levels span the raw monitor buffer (1 week),
+# only the coarse ones reach further back. Each level must keep at least one bucket of the next coarser level.
+rollupRetention = {60: 7*86400, 600: 7*86400, 3600: 31*86400, 86400: 31*86400}
+
+
+class RadarRollup(object):
+  """
+  Multi-resolution aggregates of one sensor series.
+
+  For every level (bucket width in seconds) a ring buffer holds one row per
+  bucket: its start stamp and, per value field, the min, max, sum and count
+  of the non-NaN values in it. Appended samples are folded into the open
+  (last) bucket and new buckets, so ingest only touches the new samples.
+  Changes to already aggregated samples need rebuild() with the raw samples
+  from the start of the changed finest bucket on; the coarser levels are then
+  re-folded from the buckets of the next finer level, so a correction only
+  reads a few raw samples and bucket rows.
+  Each level keeps retention[w] seconds of buckets and is allocated lazily,
+  so buckets can outlive the raw samples they were built from.
+  """
+  def __init__(self, fields, levels=rollupLevels, retention=rollupRetention):
+    self.fields = list(fields)
+    self.levels = sorted(levels)
+    self.columns = ["stamp"] + [ "{}_{}".format(f, a) for f in self.fields for a in ["min", "max", "sum", "count"] ]
+    self.buckets = { w:RadarRingBuffer(self.columns, maxlen=max(int(np.ceil(retention[w] / float(w))), 2), chunk=64, prealloc=False) for w in self.levels }
+
+  def clear(self):
+    for b in self.buckets.values(): b.clear()
+
+  # folds time sorted samples into all levels, stamps in epoch seconds, values maps field -> array.
+  # samples must not be older than the last bucket of any level.
+  def add(self, stamps, values):
+    if len(stamps) == 0: return
+    stamps = np.asarray(stamps, dtype=np.float64)
+    for w,buf in self.buckets.items():
+      rows = self.aggregate(w, stamps, values)
+      last = buf.last()
+      if last is not None and rows[0]["stamp"] == last["stamp"]:
+        self.combine(last, rows[0])
+        rows = rows[1:]
+      buf.extend(rows)
+
+  # recomputes all buckets from the bucket containing `start` on, stamps/values are the raw samples
+  # from (at least) the start of the finest bucket containing `start` on
+  def rebuild(self, start, stamps, values):
+    stamps = np.asarray(stamps, dtype=np.float64)
+    finer = None
+    for w in self.levels:
+      buf = self.buckets[w]
+      t = np.floor(start / w) * w
+      buf.truncate(np.searchsorted(buf.column("stamp"), t, side="left"))
+      if finer is None:
+        i = np.searchsorted(stamps, t, side="left")
+        if i < len(stamps):
+          buf.extend(self.aggregate(w, stamps[i:], { f:np.asarray(v)[i:] for f,v in values.items() }))
+      else:
+        rows = self.getBuckets(finer, t)
+        if len(rows) > 0:
+          buf.extend(self.aggregateBuckets(w, rows))
+      finer = w
+
+  def startOfBucket(self, stamp):
+    return np.floor(stamp / self.levels[0]) * self.levels[0]
+
+  # aggregates time sorted samples into buckets of width w
+  def aggregate(self, w, stamps, values):
+    b = np.floor(stamps / w) * w
+    starts = np.flatnonzero(np.concatenate(([True], b[1:] != b[:-1])))
+    rows = np.empty(len(starts), dtype=self.buckets[w].dtype)
+    rows["stamp"] = b[starts]
+    for f in self.fields:
+      v = np.asarray(values[f], dtype=np.float64)
+      valid = ~np.isnan(v)
+      rows[f+"_min"] = np.fmin.reduceat(v, starts)
+      rows[f+"_max"] = np.fmax.reduceat(v, starts)
+      rows[f+"_sum"] = np.add.reduceat(np.where(valid, v, 0.), starts)
+      rows[f+"_count"] = np.add.reduceat(valid.astype(np.float64), starts)
+    return rows
+
+  # aggregates time sorted bucket rows of a finer level into buckets of width w
+  def aggregateBuckets(self, w, rows):
+    b = np.floor(rows["stamp"] / w) * w
+    starts = np.flatnonzero(np.concatenate(([True], b[1:] != b[:-1])))
+    out = np.empty(len(starts), dtype=self.buckets[w].dtype)
+    out["stamp"] = b[starts]
+    for f in self.fields:
+      out[f+"_min"] = np.fmin.reduceat(rows[f+"_min"], starts)
+      out[f+"_max"] = np.fmax.reduceat(rows[f+"_max"], starts)
+      out[f+"_sum"] = np.add.reduceat(rows[f+"_sum"], starts)
+      out[f+"_count"] = np.add.reduceat(rows[f+"_count"], starts)
+    return out
+
+  # merges bucket row b into bucket row a (in place)
+  def combine(self, a, b):
+    for f in self.fields:
+      a[f+"_min"] = np.fmin(a[f+"_min"], b[f+"_min"])
+      a[f+"_max"] = np.fmax(a[f+"_max"], b[f+"_max"])
+      a[f+"_sum"] += b[f+"_sum"]
+      a[f+"_count"] += b[f+"_count"]
+
+  # buckets of level w that overlap [start, end], as a structured array view
+  def getBuckets(self, w, start=None, end=None):
+    view = self.buckets[w].view()
+    stamps = view["stamp"]
+    lo = 0 if start is None else np.searchsorted(stamps, np.floor(start / w) * w, side="left")
+    hi = len(view) if end is None else np.searchsorted(stamps, end, side="right")
+    return view[lo:hi]
+
+  # coarsest level with buckets not wider than `width` seconds, None if all are wider
+  def levelFor(self, width):
+    fitting = [ w for w in self.levels if w <= width ]
+    return fitting[-1] if fitting else None
+
+  # (min, max, mean, count) of a field within [start, end], the range is rounded outward to the buckets of level w.
+  # by default w is the coarsest level with at least 100 buckets in the range (the coarsest overall for open ranges)
+  def getStats(self, field, start=None, end=None, w=None):
+    if w is None:
+      if start is None or end is None: w = self.levels[-1]
+      else: w = self.levelFor((end - start) / 100.) or self.levels[0]
+    b = self.getBuckets(w, start, end)
+    count = b[field+"_count"].sum()
+    if count == 0: return (np.nan, np.nan, np.nan, 0)
+    return (float(np.nanmin(b[field+"_min"])), float(np.nanmax(b[field+"_max"])), float(b[field+"_sum"].sum() / count), int(count))
+
+  def nbytes(self):
+    return sum( b.nbytes() for b in self.buckets.values() )
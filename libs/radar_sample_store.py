@@ -0,0 +1,59 @@
+import json
+import sqlite3
+import threading
+import logging
+from pprint import pprint
+
+__all__ = ['RadarSampleStore']
+
+
+class RadarSampleStore(object):
+  """
+  Local SQLite store of raw json samples, used to warm start the monitor.
+
+  Samples are kept per series key (subjectId, sourceId, sensor, stat, interval)
+  and stamp (the fixed-width startDateTime string, which sorts like the time);
+  writing a stamp again replaces the sample (late corrections).
+  One connection is shared by all threads and guarded by a lock, the database
+  runs in WAL mode so commits are cheap appends to the log.
+  """
+  def __init__(self, path):
+    self.path = path
+    self.lock = threading.Lock()
+    self.conn = sqlite3.connect(path, check_same_thread=False)
+    with self.lock, self.conn:
+      self.conn.execute("PRAGMA journal_mode=WAL")
+      self.conn.execute("PRAGMA synchronous=NORMAL")
+      self.conn.execute("CREATE TABLE IF NOT EXISTS samples ("
+                        "subject TEXT, source TEXT, sensor TEXT, stat TEXT, interval TEXT, stamp TEXT, sample TEXT, "
+                        "PRIMARY KEY (subject, source, sensor, stat, interval, stamp)) WITHOUT ROWID")
+
+  # stores raw json samples of one series
+  def put(self, key, samples):
+    if len(samples) == 0: return
+    rows = [ tuple(key) + (d["startDateTime"], json.dumps(d, separators=(",", ":"))) for d in samples ]
+    with self.lock, self.conn:
+      self.conn.executemany("INSERT OR REPLACE INTO samples VALUES (?,?,?,?,?,?,?)", rows)
+
+  # returns the last `limit` samples (all by default) of one series with stamp >= since, sorted by time
+  def load(self, key, since=None, limit=None):
+    query = "SELECT sample FROM samples WHERE subject=? AND source=? AND sensor=? AND stat=? AND interval=?"
+    params = list(key)
+    if since is not None:
+      query += " AND stamp>=?"
+      params.append(since)
+    query += " ORDER BY stamp DESC LIMIT ?"
+    params.append(-1 if limit is None else limit)
+    with self.lock:
+      rows = self.conn.execute(query, params).fetchall()
+    # one json document for all samples instead of one parse per row
+    return json.loads("[" + ",".join( r[0] for r in reversed(rows) ) + "]")
+
+  # deletes all samples older than the given stamp string, returns the number of deleted samples
+  def prune(self, before):
+    with self.lock, self.conn:
+      return self.conn.execute("DELETE FROM samples WHERE stamp<?", (before,)).rowcount
+
+  def close(self):
+    with self.lock:
+      self.conn.close()
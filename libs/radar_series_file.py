@@ -0,0 +1,77 @@
+import os, re, time
+import json
+import logging
+from pprint import pprint
+
+import numpy as np
+
+__all__ = ['writeSeries','readSeries','listSeries','seriesPath']
+
+
+# file name of a series, without extension: <directory>/<subjectId>/<sourceId>/<sensor>
+def seriesPath(directory, subjectID, sourceID, sensorType):
+  return os.path.join(directory, safeName(subjectID), safeName(sourceID), safeName(sensorType))
+
+def safeName(name):
+  return re.sub(r"[^A-Za-z0-9._-]", "_", str(name))
+
+# writes the columns of a series (stamps + value fields, float64) as fixed-width little endian rows to a new
+# <path>.<id>.f8 file, then atomically replaces the json index <path>.json pointing to it and removes the previous file.
+# readers that already mapped the previous file keep seeing its data. info is added to the index (e.g. stat/interval).
+def writeSeries(path, stamps, values, info=None):
+  fields = ["stamp"] + list(values.keys())
+  dtype = np.dtype([ (f, "<f8") for f in fields ])
+  rows = np.empty(len(stamps), dtype=dtype)
+  rows["stamp"] = stamps
+  for f,v in values.items():
+    rows[f] = v
+
+  index = dict(info or {})
+  index.update({
+    "file": "{}.{:x}.f8".format(os.path.basename(path), time.time_ns()),
+    "dtype": [ [f, "<f8"] for f in fields ],
+    "length": len(rows),
+    "first": float(rows["stamp"][0]) if len(rows) else None,
+    "last": float(rows["stamp"][-1]) if len(rows) else None
+  })
+
+  directory = os.path.dirname(path)
+  os.makedirs(directory, exist_ok=True)
+  try:
+    with open(path + ".json") as f: previous = json.load(f)["file"]
+  except (OSError, ValueError, KeyError):
+    previous = None
+
+  rows.tofile(os.path.join(directory, index["file"]))
+  with open(path + ".json.tmp", "w") as f:
+    json.dump(index, f, indent=2)
+  os.replace(path + ".json.tmp", path + ".json")
+  if previous and previous != index["file"]:
+    try: os.remove(os.path.join(directory, previous))
+    except OSError: pass
+  return index
+
+# opens a series written by writeSeries, path is the index file or the path without extension.
+# returns (index, rows), rows is a read-only np.memmap of the structured rows (None if empty).
+# a concurrent writeSeries may remove the data file between reading the index and mapping it,
+# the index is then read again once.
+def readSeries(path, retries=1):
+  if path.endswith(".json"): path = path[:-len(".json")]
+  with open(path + ".json") as f:
+    index = json.load(f)
+  if index["length"] == 0:
+    return index, None
+  dtype = np.dtype([ tuple(d) for d in index["dtype"] ])
+  try:
+    rows = np.memmap(os.path.join(os.path.dirname(path), index["file"]), dtype=dtype, mode="r", shape=(index["length"],))
+  except FileNotFoundError:
+    if retries <= 0: raise
+    return readSeries(path, retries - 1)
+  return index, rows
+
+# index file paths of all series below directory
+def listSeries(directory):
+  found = []
+  for root, dirs, files in os.walk(directory):
+    found.extend( os.path.join(root, f) for f in files if f.endswith(".json") )
+  return sorted(found)
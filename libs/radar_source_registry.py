@@ -0,0 +1,72 @@
+import threading
+import collections
+import logging
+from pprint import pprint
+
+__all__ = ['RadarSourceRegistry']
+
+
+class RadarSourceRegistry(object):
+  """
+  Registry of RadarPatientSource objects keyed by (subjectID, sourceID).
+
+  Lookups are O(1) dict accesses and iteration follows insertion order.
+  The registry lock only guards the key set; each source carries its own
+  `lock` for its data, so callbacks for different sources do not block
+  each other. Iterating works on a copy of the current sources and never
+  holds the registry lock while the caller works on them.
+  """
+  def __init__(self):
+    self.sources = collections.OrderedDict()
+    self.lock = threading.RLock()
+
+  def __len__(self):
+    return len(self.sources)
+
+  def __contains__(self, key):
+    return tuple(key) in self.sources
+
+  def __iter__(self):
+    return iter(self.values())
+
+  def get(self, key, default=None):
+    return self.sources.get(tuple(key), default)
+
+  def keys(self):
+    with self.lock:
+      return list(self.sources.keys())
+
+  def values(self):
+    with self.lock:
+      return list(self.sources.values())
+
+  # adds a source if its key is not registered yet, returns the registered source
+  def add(self, source):
+    key = (source.subjectID, source.sourceID)
+    with self.lock:
+      return self.sources.setdefault(key, source)
+
+  def remove(self, key):
+    with self.lock:
+      return self.sources.pop(tuple(key), None)
+
+  # makes the registered keys equal to `keys` (in that order), creating missing sources with factory(subjectID, sourceID)
+  # returns the lists of added and removed keys
+  def sync(self, keys, factory):
+    keys = [ tuple(k) for k in keys ]
+    with self.lock:
+      wanted = set(keys)
+      removed = [ k for k in self.sources if k not in wanted ]
+      for k in removed:
+        del self.sources[k]
+      added = []
+      sources = collections.OrderedDict()
+      for k in keys:
+        if k in sources: continue
+        if k not in self.sources:
+          added.append(k)
+          sources[k] = factory(*k)
+        else:
+          sources[k] = self.sources[k]
+      self.sources = sources
+      return added, removed
@@ -0,0 +1,96 @@
+import bisect
+import numpy as np
+
+__all__ = ['RadarStatusTable']
+
+
+class RadarStatusTable(object):
+  """
+  Status model compiled from a status description dict, e.g.
+  {"GOOD": {"priority": 1, "th_min": 0, "th_bat": 0.25, ...}, ...}.
+
+  Statuses are numbered in dict order (codes); the time and battery
+  thresholds are kept as sorted arrays, so evaluating a status is a
+  binary search, and whole arrays of stamps/battery levels are evaluated
+  with one np.searchsorted call.
+  A threshold < 0 means the status is never reached by that criterion.
+  """
+  def __init__(self, status_desc, na="N/A", disconnected="DISCONNECTED"):
+    self.names = list(status_desc.keys())
+    self.codes = { name:i for i,name in enumerate(self.names) }
+    self.na = self.codes[na]
+    self.disconnected = self.codes[disconnected]
+    self.priority = np.array([ status_desc[n]["priority"] for n in self.names ])
+
+    # status reached once diff >= th (seconds)
+    time_th = sorted([ (d["th_min"] * 60., self.codes[n]) for n,d in status_desc.items() if d["th_min"] >= 0 ])
+    self.time_th = [ th for th,c in time_th ]
+    self.time_codes = [ c for th,c in time_th ]
+    self.time_th_arr = np.array(self.time_th, dtype=np.float64)
+    self.time_codes_arr = np.array([self.na] + self.time_codes)
+
+    # status reached once battery > th
+    bat_th = sorted([ (d["th_bat"], self.codes[n]) for n,d in status_desc.items() if d["th_bat"] >= 0 ])
+    self.bat_th = [ th for th,c in bat_th ]
+    self.bat_codes = [ c for th,c in bat_th ]
+    self.bat_th_arr = np.array(self.bat_th, dtype=np.float64)
+    self.bat_codes_arr = np.array([self.na] + self.bat_codes)
+
+    # priority order used to aggregate statuses, disconnected overrides everything
+    self.prio_order = sorted(range(len(self.names)), key=lambda c: self.priority[c])
+    self.prio_rank = { c:i for i,c in enumerate(self.prio_order) }
+
+
+  #
+  # Scalar evaluation, returns status names
+  #
+
+  def timeStatus(self, diff):
+    if diff is None or diff != diff: return self.names[self.na]
+    i = bisect.bisect_right(self.time_th, diff)
+    return self.names[self.time_codes[i-1]] if i > 0 else self.names[self.na]
+
+  def batteryStatus(self, bat):
+    if bat is None or bat != bat: return self.names[self.na]
+    i = bisect.bisect_left(self.bat_th, bat)
+    return self.names[self.bat_codes[i-1]] if i > 0 else self.names[self.na]
+
+  # aggregated status of several statuses (names)
+  def prioStatus(self, statuses):
+    codes = [ self.codes[s] for s in statuses ]
+    if self.disconnected in codes: return self.names[self.disconnected]
+    return self.names[max(codes, key=lambda c: self.prio_rank[c])]
+
+
+  #
+  # Vectorized evaluation, returns status codes
+  #
+
+  # diffs in seconds, NaN for no data
+  def timeStatusCodes(self, diffs):
+    diffs = np.asarray(diffs, dtype=np.float64)
+    idx = np.searchsorted(self.time_th_arr, diffs, side="right")
+    idx[np.isnan(diffs)] = 0
+    return self.time_codes_arr[idx]
+
+  # battery levels, NaN for no data
+  def batteryStatusCodes(self, bats):
+    bats = np.asarray(bats, dtype=np.float64)
+    idx = np.searchsorted(self.bat_th_arr, bats, side="left")
+    idx[np.isnan(bats)] = 0
+    return self.bat_codes_arr[idx]
+
+  # epoch seconds of the last samples (NaN for no data), future stamps count as now
+  def stampStatusCodes(self, stamps, now):
+    stamps = np.asarray(stamps, dtype=np.float64)
+    return self.timeStatusCodes(np.maximum(now - stamps, 0))
+
+  # aggregates a (n x m) matrix of status codes along its last axis
+  def prioStatusCodes(self, codes):
+    codes = np.asarray(codes)
+    rank = np.array([ self.prio_rank[c] for c in range(len(self.names)) ])[codes]
+    prio = np.array(self.prio_order)[rank.max(axis=-1)]
+    return np.where((codes == self.disconnected).any(axis=-1), self.disconnected, prio)
+
+  def statusNames(self, codes):
+    return np.array(self.names, dtype=object)[np.asarray(codes)]
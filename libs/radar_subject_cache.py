@@ -0,0 +1,80 @@
+import time
+import threading
+import collections
+import logging
+from pprint import pprint
+
+__all__ = ['RadarSubjectCache','RadarRosterDiff']
+
+
+# (subjectId, sourceId) pairs that appeared / disappeared with the last roster change
+RadarRosterDiff = collections.namedtuple("RadarRosterDiff", ["added", "removed"])
+
+
+class RadarSubjectCache(object):
+  """
+  Caches the subject/source roster of a study for `ttl` seconds.
+
+  `fetch` is called without arguments and returns a getAllSubjects response.
+  Only the first lookup blocks; once the ttl expires, the roster is refreshed
+  in the background and callers keep getting the cached one in the meantime.
+  `version` is incremented whenever the roster actually changed, `diff` holds
+  the pairs added/removed by that change.
+  """
+  def __init__(self, fetch, ttl=60., sourceTypes=["EMPATICA"]):
+    self.fetch = fetch
+    self.ttl = ttl
+    self.sourceTypes = sourceTypes
+
+    self.subject_sources = None
+    self.version = 0
+    self.diff = RadarRosterDiff(set(), set())
+    self.stamp = None
+
+    self.lock = threading.Lock()
+    self.refreshing = False
+
+  # returns (subject_sources, version), subject_sources is an ordered dict of subjectId -> [sourceId]
+  # and is replaced, never modified, on changes
+  def get(self):
+    with self.lock:
+      if self.subject_sources is not None:
+        expired = time.time() - self.stamp >= self.ttl
+        if expired and not self.refreshing:
+          self.refreshing = True
+          threading.Thread(target=self.refreshAsync, name="subject_cache").start()
+        return self.subject_sources, self.version
+
+    self.refresh()
+    with self.lock:
+      return self.subject_sources, self.version
+
+  def refreshAsync(self):
+    try:
+      self.refresh()
+    except Exception as e:
+      logging.error("[SUBJECTS] roster refresh failed: {}".format(e))
+    finally:
+      with self.lock:
+        self.refreshing = False
+
+  # fetches the roster now, raises whatever fetch raises
+  def refresh(self):
+    response = self.fetch()
+    subject_sources = collections.OrderedDict()
+    for subject in sorted(response["subjects"], key=lambda s: s["subjectId"]):
+      subject_sources[subject["subjectId"]] = [ source["id"] for source in subject["sources"] if source["type"] in self.sourceTypes ]
+
+    with self.lock:
+      old = self.pairs(self.subject_sources)
+      new = self.pairs(subject_sources)
+      if self.subject_sources is None or old != new or list(self.subject_sources.keys()) != list(subject_sources.keys()):
+        self.diff = RadarRosterDiff(new - old, old - new)
+        self.subject_sources = subject_sources
+        self.version += 1
+        logging.info("[SUBJECTS] roster changed, added: {} removed: {}".format(sorted(self.diff.added), sorted(self.diff.removed)))
+      self.stamp = time.time()
+
+  def pairs(self, subject_sources):
+    if subject_sources is None: return set()
+    return set( (sub,src) for sub in subject_sources for src in subject_sources[sub] )
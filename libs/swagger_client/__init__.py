@@ -17,9 +17,11 @@ from __future__ import absolute_import
 
 # import apis into sdk package
 from .apis.default_api import DefaultApi
+from .apis.async_default_api import AsyncDefaultApi
 
 # import ApiClient
 from .api_client import ApiClient
+from .async_api_client import AsyncApiClient
 
 from .configuration import Configuration
 
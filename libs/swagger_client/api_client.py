@@ -17,6 +17,9 @@ import json
 import mimetypes
 import tempfile
 import threading
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
 
 from datetime import date, datetime
 
@@ -27,6 +30,22 @@ from six.moves.urllib.parse import quote
 from . import models
 from .configuration import Configuration
 from .rest import ApiException, RESTClientObject
+from .rate_limit import get_rate_limiter
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight(object):
+    """
+    One in-flight request shared by all concurrent identical calls.
+    """
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
 
 
 class ApiClient(object):
@@ -59,11 +78,22 @@ class ApiClient(object):
         'object': object,
     }
 
-    def __init__(self, host=None, header_name=None, header_value=None, cookie=None):
+    def __init__(self, host=None, header_name=None, header_value=None, cookie=None,
+                 async_workers=None, async_queue_size=None):
         """
         Constructor of the class.
         """
-        self.rest_client = RESTClientObject(maxsize=32)
+        self.rest_client = RESTClientObject()
+        # worker pool for asynchronous requests, created on first use
+        self.async_workers = async_workers if async_workers is not None else Configuration().async_workers
+        self.async_queue_size = async_queue_size if async_queue_size is not None else Configuration().async_queue_size
+        self._pool = None
+        self._pool_slots = None
+        self._pool_lock = threading.Lock()
+        # identical GET/HEAD requests in flight, see __single_flight
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self.coalesced = 0
         self.default_headers = {}
         if header_name is not None:
             self.default_headers[header_name] = header_value
@@ -141,24 +171,43 @@ class ApiClient(object):
         # request url
         url = self.host + resource_path
 
-        # perform request and return response
-        response_data = self.request(method, url,
-                                     query_params=query_params,
-                                     headers=header_params,
-                                     post_params=post_params, body=body,
-                                     _preload_content=_preload_content,
-                                     _request_timeout=_request_timeout)
+        def fetch():
+            # perform request, within the rate limit of its endpoint family
+            limiter = get_rate_limiter(resource_path)
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                response_data = self.request(method, url,
+                                             query_params=query_params,
+                                             headers=header_params,
+                                             post_params=post_params, body=body,
+                                             _preload_content=_preload_content,
+                                             _request_timeout=_request_timeout)
+            finally:
+                if limiter is not None:
+                    limiter.release()
+
+            return_data = response_data
+            if _preload_content:
+                # deserialize response data, once per cached response
+                decoded_type = response_type or "object"
+                if decoded_type in response_data.decoded:
+                    return_data = response_data.decoded[decoded_type]
+                else:
+                    return_data = self.deserialize(response_data, decoded_type)
+                    if response_data.cached:
+                        response_data.decoded[decoded_type] = return_data
+            return response_data, return_data
+
+        # identical reads that are already in flight share its response
+        if method in ('GET', 'HEAD') and _preload_content and not (post_params or body):
+            key = (method, url, tuple(query_params or ()), tuple(sorted((header_params or {}).items())), response_type)
+            response_data, return_data = self.__single_flight(key, fetch)
+        else:
+            response_data, return_data = fetch()
 
         self.last_response = response_data
 
-        return_data = response_data
-        if _preload_content:
-            # deserialize response data
-            if response_type:
-                return_data = self.deserialize(response_data, response_type)
-            else:
-                return_data = self.deserialize(response_data,"object")
-
         if callback:
             if _return_http_data_only:
                 callback(return_data)
@@ -169,6 +218,36 @@ class ApiClient(object):
         else:
             return (return_data, response_data.status, response_data.getheaders())
 
+    def __single_flight(self, key, fetch):
+        """
+        Runs fetch() once for all concurrent calls with the same key,
+        every caller gets the same result (or exception).
+        The shared deserialized data must not be modified by callers.
+        """
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                flight.result = fetch()
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self._flights_lock:
+                    del self._flights[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
     def sanitize_for_serialization(self, obj):
         """
         Builds a JSON POST object.
@@ -311,28 +390,64 @@ class ApiClient(object):
         :return:
             If provide parameter callback,
             the request will be called asynchronously.
-            The method will return the request thread.
+            The method will return a future of the request, or the
+            request thread if `async_workers` is None.
             If parameter callback is None,
             then the method will return the response directly.
         """
+        args = (resource_path, method,
+                path_params, query_params,
+                header_params, body,
+                post_params, files,
+                response_type, auth_settings,
+                callback, _return_http_data_only,
+                collection_formats, _preload_content, _request_timeout)
         if callback is None:
-            return self.__call_api(resource_path, method,
-                                   path_params, query_params, header_params,
-                                   body, post_params, files,
-                                   response_type, auth_settings, callback,
-                                   _return_http_data_only, collection_formats, _preload_content, _request_timeout)
+            return self.__call_api(*args)
+        elif self.async_workers:
+            return self.submit(self.__call_api, *args)
         else:
-            thread = threading.Thread(target=self.__call_api,
-                                      args=(resource_path, method,
-                                            path_params, query_params,
-                                            header_params, body,
-                                            post_params, files,
-                                            response_type, auth_settings,
-                                            callback, _return_http_data_only,
-                                            collection_formats, _preload_content, _request_timeout))
+            thread = threading.Thread(target=self.__call_api, args=args)
         thread.start()
         return thread
 
+    def submit(self, fn, *args):
+        """
+        Runs fn(*args) on the worker pool of this client.
+
+        Blocks while `async_queue_size` requests are already pending,
+        so callers are slowed down when the server is.
+
+        :return: concurrent.futures.Future of the call.
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.async_workers,
+                                                thread_name_prefix="api_client")
+                self._pool_slots = threading.BoundedSemaphore(max(self.async_queue_size, self.async_workers))
+        self._pool_slots.acquire()
+        try:
+            future = self._pool.submit(fn, *args)
+        except Exception:
+            self._pool_slots.release()
+            raise
+        future.add_done_callback(self.__async_done)
+        return future
+
+    def __async_done(self, future):
+        self._pool_slots.release()
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("asynchronous request failed: %s", future.exception())
+
+    def close(self):
+        """
+        Shuts down the worker pool, waiting for pending requests.
+        """
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
     def request(self, method, url, query_params=None, headers=None,
                 post_params=None, body=None, _preload_content=True, _request_timeout=None):
         """
@@ -2,3 +2,4 @@ from __future__ import absolute_import
 
 # import apis into api package
 from .default_api import DefaultApi
+from .async_default_api import AsyncDefaultApi
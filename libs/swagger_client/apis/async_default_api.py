@@ -0,0 +1,91 @@
+# coding: utf-8
+
+"""
+    RADAR-CNS Downstream REST APIs
+
+    asyncio counterpart of DefaultApi. Every endpoint has the same method name,
+    argument order and path template as in DefaultApi, but is a coroutine
+    returning the response data.
+"""
+
+from __future__ import absolute_import
+
+from ..async_api_client import AsyncApiClient
+
+
+# method name -> (path template, accept header, positional parameter names)
+endpoints = {
+    'get_all_sources_avro': ('/source/avro/getAllSources/{subjectId}', 'application/octet-stream', ['subject_id']),
+    'get_all_sources_json': ('/source/getAllSources/{subjectId}', 'application/json', ['subject_id']),
+    'get_all_subjects_avro': ('/subject/avro/getAllSubjects/{studyId}', 'application/octet-stream', ['study_id']),
+    'get_all_subjects_json': ('/subject/getAllSubjects/{studyId}', 'application/json', ['study_id']),
+    'get_last_computed_source_status_avro': ('/source/avro/state/{subjectId}/{sourceId}', 'application/octet-stream', ['subject_id', 'source_id']),
+    'get_last_computed_source_status_json': ('/source/state/{subjectId}/{sourceId}', 'application/json', ['subject_id', 'source_id']),
+    'get_last_received_app_status_avro': ('/android/avro/status/{subjectId}/{sourceId}', 'application/octet-stream', ['subject_id', 'source_id']),
+    'get_last_received_app_status_json': ('/android/status/{subjectId}/{sourceId}', 'application/json', ['subject_id', 'source_id']),
+    'get_last_received_sample_avro': ('/data/avro/realTime/{sensor}/{stat}/{interval}/{subjectId}/{sourceId}', 'application/octet-stream', ['sensor', 'stat', 'interval', 'subject_id', 'source_id']),
+    'get_last_received_sample_json': ('/data/realTime/{sensor}/{stat}/{interval}/{subjectId}/{sourceId}', 'application/json', ['sensor', 'stat', 'interval', 'subject_id', 'source_id']),
+    'get_samples_avro': ('/data/avro/{sensor}/{stat}/{interval}/{subjectId}/{sourceId}', 'application/octet-stream', ['sensor', 'stat', 'interval', 'subject_id', 'source_id']),
+    'get_samples_json': ('/data/{sensor}/{stat}/{interval}/{subjectId}/{sourceId}', 'application/json', ['sensor', 'stat', 'interval', 'subject_id', 'source_id']),
+    'get_samples_within_window_avro': ('/data/avro/{sensor}/{stat}/{interval}/{subjectId}/{sourceId}/{start}/{end}', 'application/octet-stream', ['sensor', 'stat', 'interval', 'subject_id', 'source_id', 'start', 'end']),
+    'get_samples_within_window_json': ('/data/{sensor}/{stat}/{interval}/{subjectId}/{sourceId}/{start}/{end}', 'application/json', ['sensor', 'stat', 'subject_id', 'source_id', 'interval', 'start', 'end']),
+    'get_source_specification_avro': ('/source/avro/specification/{sourceType}', 'application/octet-stream', ['source_type']),
+    'get_source_specification_json': ('/source/specification/{sourceType}', 'application/json', ['source_type']),
+    'get_subject_avro': ('/subject/avro/getSubject/{subjectId}', 'application/octet-stream', ['subject_id']),
+    'get_subject_json': ('/subject/getSubject/{subjectId}', 'application/json', ['subject_id']),
+}
+
+# python parameter name -> path template name
+path_param_names = {
+    'subject_id': 'subjectId',
+    'source_id': 'sourceId',
+    'study_id': 'studyId',
+    'source_type': 'sourceType',
+}
+
+
+def _endpoint(name, resource_path, accept, params):
+    async def call(self, *args, **kwargs):
+        _request_timeout = kwargs.pop('_request_timeout', None)
+        if len(args) > len(params):
+            raise TypeError("{} takes {} arguments but {} were given".format(name, len(params), len(args)))
+        values = dict(zip(params, args))
+        for key, val in kwargs.items():
+            if key not in params or key in values:
+                raise TypeError(
+                    "Got an unexpected keyword argument '%s'"
+                    " to method %s" % (key, name)
+                )
+            values[key] = val
+        for p in params:
+            if values.get(p) is None:
+                raise ValueError("Missing the required parameter `%s` when calling `%s`" % (p, name))
+
+        path_params = { path_param_names.get(p, p): values[p] for p in params }
+        return await self.api_client.call_api(resource_path, 'GET',
+                                              path_params,
+                                              header_params={'Accept': accept},
+                                              _request_timeout=_request_timeout)
+
+    call.__name__ = name
+    call.__doc__ = "GET {}\n\n:params: {}\n:return: response data (coroutine)".format(resource_path, ", ".join(params))
+    return call
+
+
+class AsyncDefaultApi(object):
+    """
+    asyncio RADAR-CNS REST API.
+
+    >>> async with AsyncApiClient(max_in_flight=64) as client:
+    >>>     api = AsyncDefaultApi(client)
+    >>>     data = await api.get_samples_json(sensor, stat, interval, subject_id, source_id)
+    """
+
+    def __init__(self, api_client=None):
+        if api_client is None:
+            api_client = AsyncApiClient()
+        self.api_client = api_client
+
+
+for _name, (_path, _accept, _params) in endpoints.items():
+    setattr(AsyncDefaultApi, _name, _endpoint(_name, _path, _accept, _params))
@@ -0,0 +1,158 @@
+# coding: utf-8
+
+"""
+    RADAR-CNS Downstream REST APIs
+
+    asyncio counterpart of ApiClient, built on aiohttp.
+"""
+
+from __future__ import absolute_import
+
+import ssl
+import json
+import asyncio
+import logging
+
+import certifi
+from six.moves.urllib.parse import quote
+
+from .configuration import Configuration
+from .rest import ApiException
+from .rate_limit import get_rate_limiter
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncApiClient(object):
+    """
+    asyncio API client.
+
+    All requests share one aiohttp session (and with it one keep-alive
+    connection pool). At most `max_in_flight` requests are running at any
+    time, further requests wait for a free slot. Requests also count
+    against the shared rate limits of their endpoint family, see
+    `Configuration.rate_limits`.
+
+    :param host: The base path for the server to call.
+    :param max_in_flight: max number of concurrent requests.
+    :param limit_per_host: max number of connections per host, 0 is unlimited.
+    """
+
+    def __init__(self, host=None, max_in_flight=32, limit_per_host=0):
+        """
+        Constructor of the class.
+        """
+        if aiohttp is None:
+            raise ImportError('asyncio client requires aiohttp.')
+        if host is None:
+            self.host = Configuration().host
+        else:
+            self.host = host
+        self.max_in_flight = max_in_flight
+        self.limit_per_host = limit_per_host
+        self.default_headers = {'User-Agent': 'Swagger-Codegen/1.0.0/python/asyncio'}
+        self._session = None
+        self._in_flight = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _ssl_context(self):
+        config = Configuration()
+        if not config.verify_ssl:
+            return False
+        context = ssl.create_default_context(cafile=config.ssl_ca_cert or certifi.where())
+        if config.cert_file:
+            context.load_cert_chain(config.cert_file, config.key_file)
+        return context
+
+    def _get_session(self):
+        # the session and semaphore have to be created inside the running loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_in_flight,
+                                             limit_per_host=self.limit_per_host,
+                                             ssl=self._ssl_context())
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        return self._session
+
+    async def close(self):
+        """
+        Closes the shared session and its connections.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def call_api(self, resource_path, method,
+                       path_params=None, query_params=None, header_params=None,
+                       _request_timeout=None):
+        """
+        Makes the HTTP request and returns the deserialized data.
+
+        :param resource_path: Path to method endpoint.
+        :param method: Method to call.
+        :param path_params: Path parameters in the url.
+        :param query_params: Query parameters in the url.
+        :param header_params: Header parameters to be
+            placed in the request header.
+        :param _request_timeout: timeout setting for this request. If one number provided, it will be total request
+                                 timeout. It can also be a pair (tuple) of (connection, read) timeouts.
+        :return: json data as dict/list, str if the body is not json,
+            bytes for `application/octet-stream` responses.
+        """
+        headers = dict(self.default_headers)
+        headers.update(header_params or {})
+
+        limiter = get_rate_limiter(resource_path)
+        for k, v in (path_params or {}).items():
+            resource_path = resource_path.replace(
+                '{%s}' % k, quote(str(v), safe=''))  # no safe chars, encode everything
+
+        timeout = None
+        if isinstance(_request_timeout, tuple) and len(_request_timeout) == 2:
+            timeout = aiohttp.ClientTimeout(sock_connect=_request_timeout[0], sock_read=_request_timeout[1])
+        elif _request_timeout:
+            timeout = aiohttp.ClientTimeout(total=_request_timeout)
+
+        session = self._get_session()
+        async with self._in_flight:
+            if limiter is not None:
+                await limiter.acquire_async()
+            try:
+                async with session.request(method, self.host + resource_path,
+                                           params=query_params or None,
+                                           headers=headers,
+                                           timeout=timeout) as r:
+                    data = await r.read()
+                    status, reason, resp_headers = r.status, r.reason, dict(r.headers)
+            except aiohttp.ClientError as e:
+                raise ApiException(status=0, reason="{0}\n{1}".format(type(e).__name__, str(e)))
+            finally:
+                if limiter is not None:
+                    limiter.release()
+
+        if status not in range(200, 206):
+            ex = ApiException(status=status, reason=reason)
+            ex.body = data.decode('utf8', 'replace')
+            ex.headers = resp_headers
+            raise ex
+
+        if headers.get('Accept') == 'application/octet-stream':
+            return data
+
+        data = data.decode('utf8')
+        logger.debug("response body: %s", data)
+        try:
+            return json.loads(data)
+        except ValueError:
+            return data
@@ -86,6 +86,51 @@ class Configuration(object):
         # client key file
         self.key_file = None
 
+        # Connection pool settings
+        # Number of connection pools (one per host)
+        self.connection_pools = 4
+        # Max number of kept-alive connections per host,
+        # should be at least the number of concurrent requests
+        self.connection_pool_maxsize = 32
+        # Block instead of opening throwaway connections when all maxsize connections are in use
+        self.connection_pool_block = False
+        # Default connect/read timeouts in seconds, None waits forever
+        self.connect_timeout = None
+        self.read_timeout = None
+
+        # Asynchronous request settings
+        # Max number of worker threads for requests made with a callback.
+        # Set to None to start one thread per request instead.
+        self.async_workers = 8
+        # Max number of queued asynchronous requests, further requests block until a slot is free
+        self.async_queue_size = 64
+
+        # Client side rate limits per endpoint family (first path segment),
+        # shared by all clients of this process, '*' applies to families not listed, e.g.
+        # {'/data': {'rate': 20, 'burst': 5, 'max_in_flight': 8}, '*': {'rate': 5}}
+        # rate: requests per second, burst: bucket size, max_in_flight: max concurrent requests
+        # (all optional). Limits are read when a family is first used.
+        self.rate_limits = {}
+
+        # Accept-Encoding sent with every request, compressed responses are decoded while they are read.
+        # Set to None to request uncompressed responses
+        self.accept_encoding = 'gzip, deflate'
+
+        # Cache GET responses (see ResponseCache), revalidated with If-None-Match/If-Modified-Since
+        # if the server sends ETag/Last-Modified
+        self.response_cache = False
+        # Max number of cached responses
+        self.response_cache_size = 256
+        # Max total size of the cached response bodies (bytes), None is unlimited
+        self.response_cache_bytes = 64 * 1024 * 1024
+        # Seconds a response is served from the cache without asking the server, per url path regex;
+        # only routes listed here are cached, with a ttl of 0 they are revalidated on every request
+        self.response_cache_ttl = {
+            '/source/specification/': 3600,
+            '/subject/getAllSubjects/': 60,
+            '/source/getAllSources/': 60
+        }
+
     @property
     def logger_file(self):
         """
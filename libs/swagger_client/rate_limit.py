@@ -0,0 +1,172 @@
+# coding: utf-8
+
+"""
+    RADAR-CNS Downstream REST APIs
+
+    Client side rate limiting shared by all API clients.
+"""
+
+from __future__ import absolute_import
+
+import time
+import asyncio
+import threading
+import collections
+import logging
+
+from .configuration import Configuration
+
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter(object):
+    """
+    Token bucket plus in-flight cap for one endpoint family.
+
+    Each request reserves a token; if the bucket is empty the reservation
+    is made against future refills and the caller sleeps until its token
+    is due, so waiting callers are served in order. At most `max_in_flight`
+    requests hold the limiter at the same time; further callers queue up and
+    a released slot is handed directly to the longest waiting one, whether it
+    is a thread or a coroutine.
+
+    :param rate: requests per second, None is unlimited.
+    :param burst: bucket size, max number of requests started at once.
+    :param max_in_flight: max number of concurrent requests, None is unlimited.
+    """
+
+    def __init__(self, rate=None, burst=1, max_in_flight=None):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_in_flight = max_in_flight
+        self._tokens = float(self.burst)
+        self._stamp = time.time()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        # wake-up callbacks of callers waiting for a slot, in arrival order
+        self._waiters = collections.deque()
+        # seconds spent waiting for tokens/slots, for statistics
+        self.waited = 0.
+
+    def reserve(self):
+        """
+        Takes one token.
+
+        :return: seconds until the token is due.
+        """
+        if not self.rate:
+            return 0.
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1.
+            return max(0., -self._tokens / self.rate)
+
+    def _take_slot(self):
+        """
+        Takes a free slot, unless other callers are already waiting.
+
+        :return: True if a slot was taken.
+        """
+        if not self.max_in_flight:
+            return True
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            return True
+        return False
+
+    def acquire(self):
+        start = time.time()
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            event = None if self._take_slot() else threading.Event()
+            if event is not None:
+                self._waiters.append(event.set)
+        if event is not None:
+            event.wait()
+        self.waited += time.time() - start
+
+    async def acquire_async(self):
+        start = time.time()
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        with self._lock:
+            future = None
+            if not self._take_slot():
+                loop = asyncio.get_event_loop()
+                future = loop.create_future()
+                self._waiters.append(lambda: loop.call_soon_threadsafe(self._wake, future))
+        if future is not None:
+            try:
+                await future
+            except asyncio.CancelledError:
+                # the slot may have been handed over just before the cancellation
+                if future.done() and not future.cancelled():
+                    self.release()
+                raise
+        self.waited += time.time() - start
+
+    def _wake(self, future):
+        # a cancelled waiter passes its slot on
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self):
+        if not self.max_in_flight:
+            return
+        with self._lock:
+            if not self._waiters:
+                self._in_flight -= 1
+                return
+            # the slot stays taken and goes to the next waiter
+            wake = self._waiters.popleft()
+        wake()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def endpoint_family(resource_path):
+    """
+    First segment of a resource path, e.g. `/data` for `/data/{sensor}/...`.
+    """
+    return '/' + resource_path.lstrip('/').split('/', 1)[0]
+
+
+def get_rate_limiter(resource_path):
+    """
+    Shared limiter of the endpoint family of resource_path, configured by
+    `Configuration().rate_limits[family]` (or its `'*'` entry).
+
+    :return: RateLimiter, or None if the family is not limited.
+    """
+    family = endpoint_family(resource_path)
+    with _limiters_lock:
+        if family not in _limiters:
+            limits = Configuration().rate_limits
+            conf = limits.get(family, limits.get('*'))
+            _limiters[family] = RateLimiter(**conf) if conf else None
+        return _limiters[family]
+
+
+def rate_limit_stats():
+    """
+    :return: dict of endpoint family -> seconds spent waiting for its limiter.
+    """
+    with _limiters_lock:
+        return dict((f, l.waited) for f, l in _limiters.items() if l is not None)
@@ -0,0 +1,140 @@
+# coding: utf-8
+
+"""
+    RADAR-CNS Downstream REST APIs
+
+    HTTP response cache with conditional GET support.
+"""
+
+from __future__ import absolute_import
+
+import re
+import time
+import threading
+import collections
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry(object):
+    """
+    A cached response with its validators.
+
+    `response` is kept as is and handed out again for fresh hits and 304s,
+    its `decoded` dict holds the deserialized data per response type.
+    """
+    __slots__ = ('response', 'etag', 'last_modified', 'expires', 'nbytes')
+
+    def __init__(self, response, etag, last_modified, expires, nbytes=0):
+        self.response = response
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+        self.nbytes = nbytes
+
+    def fresh(self, now=None):
+        return self.expires > (now or time.time())
+
+    def validators(self):
+        """
+        :return: dict of conditional request headers for this entry.
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache(object):
+    """
+    LRU cache of GET responses keyed by full url.
+
+    Only responses whose path matches one of the `ttl` route patterns
+    (regex -> seconds) are cached, urls that change with every request
+    (e.g. windowed data queries) would never be hit again. Within the ttl
+    of its route a response is served without a request; afterwards it is
+    revalidated with a conditional GET if the server sent an ETag or
+    Last-Modified validator, and dropped otherwise.
+
+    :param size: max number of cached responses.
+    :param ttl: dict of path regex -> seconds a response stays fresh.
+    :param max_bytes: max total size of the cached response bodies.
+    """
+
+    def __init__(self, size=256, ttl=None, max_bytes=None):
+        self.size = size
+        self.max_bytes = max_bytes
+        self.ttl = [(re.compile(p), t) for p, t in (ttl or {}).items()]
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'bytes_saved': 0}
+
+    def route_ttl(self, url):
+        """
+        :return: seconds a response of url stays fresh, None if url is not cached.
+        """
+        for pattern, ttl in self.ttl:
+            if pattern.search(url):
+                return ttl
+        return None
+
+    def cacheable(self, url):
+        return self.route_ttl(url) is not None
+
+    def get(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def put(self, url, response):
+        """
+        Caches response if it is cacheable.
+
+        :return: the new CacheEntry, or None.
+        """
+        etag = response.getheader('ETag')
+        last_modified = response.getheader('Last-Modified')
+        ttl = self.route_ttl(url)
+        nbytes = len(response.data or '')
+        if ttl is None or not (etag or last_modified or ttl > 0) or \
+                (self.max_bytes is not None and nbytes > self.max_bytes):
+            self.remove(url)
+            return None
+        entry = CacheEntry(response, etag, last_modified, time.time() + ttl, nbytes)
+        with self._lock:
+            self._pop(url)
+            self._entries[url] = entry
+            self.nbytes += nbytes
+            while len(self._entries) > self.size or \
+                    (self.max_bytes is not None and self.nbytes > self.max_bytes):
+                self._pop(next(iter(self._entries)))
+        return entry
+
+    # extends the lifetime of an entry after a 304
+    def refresh(self, url, entry):
+        entry.expires = time.time() + (self.route_ttl(url) or 0)
+
+    def remove(self, url):
+        with self._lock:
+            self._pop(url)
+
+    def _pop(self, url):
+        entry = self._entries.pop(url, None)
+        if entry is not None:
+            self.nbytes -= entry.nbytes
+
+    def count(self, stat, n=1):
+        with self._lock:
+            self.stats[stat] += n
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
@@ -19,12 +19,14 @@ import ssl
 import certifi
 import logging
 import re
+import threading
 
 # python 2 and python 3 compatibility library
 from six import PY3
 from six.moves.urllib.parse import urlencode
 
 from .configuration import Configuration
+from .response_cache import ResponseCache
 
 try:
     import urllib3
@@ -42,6 +44,10 @@ class RESTResponse(io.IOBase):
         self.status = resp.status
         self.reason = resp.reason
         self.data = resp.data
+        # set if this response is held by the response cache and may be returned again,
+        # decoded then holds its deserialized data per response type (filled by ApiClient)
+        self.cached = False
+        self.decoded = {}
 
     def getheaders(self):
         """
@@ -58,7 +64,7 @@ class RESTResponse(io.IOBase):
 
 class RESTClientObject(object):
 
-    def __init__(self, pools_size=4, maxsize=4):
+    def __init__(self, pools_size=None, maxsize=None, block=None):
         # urllib3.PoolManager will pass all kw parameters to connectionpool
         # https://github.com/shazow/urllib3/blob/f9409436f83aeb79fbaf090181cd81b784f1b8ce/urllib3/poolmanager.py#L75
         # https://github.com/shazow/urllib3/blob/f9409436f83aeb79fbaf090181cd81b784f1b8ce/urllib3/connectionpool.py#L680
@@ -85,16 +91,81 @@ class RESTClientObject(object):
         # key file
         key_file = Configuration().key_file
 
+        # pool sizes
+        if pools_size is None:
+            pools_size = Configuration().connection_pools
+        if maxsize is None:
+            maxsize = Configuration().connection_pool_maxsize
+        if block is None:
+            block = Configuration().connection_pool_block
+
+        # default timeout
+        self.timeout = urllib3.Timeout(connect=Configuration().connect_timeout,
+                                       read=Configuration().read_timeout)
+
         # https pool manager
         self.pool_manager = urllib3.PoolManager(
             num_pools=pools_size,
             maxsize=maxsize,
+            block=block,
+            timeout=self.timeout,
             cert_reqs=cert_reqs,
             ca_certs=ca_certs,
             cert_file=cert_file,
             key_file=key_file
         )
 
+        # negotiated transfer compression and its byte counters
+        self.accept_encoding = Configuration().accept_encoding
+        self._transfer = {"responses": 0, "wire_bytes": 0, "decoded_bytes": 0}
+        self._transfer_lock = threading.Lock()
+
+        # optional cache of GET responses, see ResponseCache
+        self.cache = None
+        if Configuration().response_cache:
+            self.cache = ResponseCache(size=Configuration().response_cache_size,
+                                       ttl=Configuration().response_cache_ttl,
+                                       max_bytes=Configuration().response_cache_bytes)
+
+    def pool_stats(self):
+        """
+        Returns connection pool statistics per host, plus a "total" entry.
+        `connections` are newly opened connections, `reused` requests
+        that were sent over an already open (kept-alive) connection.
+        """
+        stats = {}
+        total = {"requests": 0, "connections": 0, "reused": 0, "idle": 0}
+        for key in self.pool_manager.pools.keys():
+            pool = self.pool_manager.pools.get(key)
+            if pool is None:
+                continue
+            host = "{0}://{1}:{2}".format(pool.scheme, pool.host, pool.port)
+            entry = {"requests": pool.num_requests,
+                     "connections": pool.num_connections,
+                     "reused": max(0, pool.num_requests - pool.num_connections),
+                     "idle": len([c for c in list(pool.pool.queue) if c is not None]) if pool.pool is not None else 0}
+            stats[host] = entry
+            for k in total:
+                total[k] += entry[k]
+        stats["total"] = total
+        return stats
+
+    def transfer_stats(self):
+        """
+        Returns byte counters of all preloaded responses: `wire_bytes` as
+        received (compressed), `decoded_bytes` after decompression.
+        """
+        with self._transfer_lock:
+            return dict(self._transfer)
+
+    def _count_transfer(self, resp, decoded):
+        # tell() is the number of bytes read from the connection, before decoding
+        wire = resp.tell() if hasattr(resp, 'tell') else decoded
+        with self._transfer_lock:
+            self._transfer["responses"] += 1
+            self._transfer["wire_bytes"] += wire
+            self._transfer["decoded_bytes"] += decoded
+
     def request(self, method, url, query_params=None, headers=None,
                 body=None, post_params=None, _preload_content=True, _request_timeout=None):
         """
@@ -121,8 +192,9 @@ class RESTClientObject(object):
 
         post_params = post_params or {}
         headers = headers or {}
+        cache_key = entry = None
 
-        timeout = None
+        timeout = self.timeout
         if _request_timeout:
             if isinstance(_request_timeout, (int, ) if PY3 else (int, long)):
                 timeout = urllib3.Timeout(total=_request_timeout)
@@ -131,6 +203,8 @@ class RESTClientObject(object):
 
         if 'Content-Type' not in headers:
             headers['Content-Type'] = 'application/json'
+        if self.accept_encoding and 'Accept-Encoding' not in headers:
+            headers['Accept-Encoding'] = self.accept_encoding
 
         try:
             # For `POST`, `PUT`, `PATCH`, `OPTIONS`, `DELETE`
@@ -180,6 +254,16 @@ class RESTClientObject(object):
                     raise ApiException(status=0, reason=msg)
             # For `GET`, `HEAD`
             else:
+                # cached GET responses are returned while fresh, otherwise revalidated
+                if method == 'GET' and self.cache is not None and _preload_content and self.cache.cacheable(url):
+                    cache_key = url + ('?' + urlencode(query_params) if query_params else '')
+                    entry = self.cache.get(cache_key)
+                    if entry is not None and entry.fresh():
+                        self.cache.count('hits')
+                        self.cache.count('bytes_saved', len(entry.response.data))
+                        return entry.response
+                    if entry is not None:
+                        headers = dict(headers, **entry.validators())
                 r = self.pool_manager.request(method, url,
                                               fields=query_params,
                                               preload_content=_preload_content,
@@ -189,8 +273,15 @@ class RESTClientObject(object):
             msg = "{0}\n{1}".format(type(e).__name__, str(e))
             raise ApiException(status=0, reason=msg)
 
+        if cache_key is not None and entry is not None and r.status == 304:
+            self.cache.refresh(cache_key, entry)
+            self.cache.count('revalidated')
+            self.cache.count('bytes_saved', len(entry.response.data))
+            return entry.response
+
         if _preload_content:
             r = RESTResponse(r)
+            self._count_transfer(r.urllib3_response, len(r.data))
 
             # In the python 3, the response.data is bytes.
             # we need to decode it to string.
@@ -203,6 +294,10 @@ class RESTClientObject(object):
         if r.status not in range(200, 206):
             raise ApiException(http_resp=r)
 
+        if cache_key is not None:
+            self.cache.count('misses')
+            r.cached = self.cache.put(cache_key, r) is not None
+
         return r
 
     def GET(self, url, headers=None, query_params=None, _preload_content=True, _request_timeout=None):
@@ -5,30 +5,33 @@ import time, datetime
 import traceback
 import argparse, json, fileinput
 from inspect import isclass
-import copy
 import math, random
 import numpy as np
-import collections
+import collections, functools
 import csv
+import signal
 from pprint import pprint
 
 import libs.swagger_client as api_client
 from libs.swagger_client.rest import ApiException
+from libs.swagger_client.rate_limit import rate_limit_stats
 import urllib3
 urllib3.disable_warnings()
 
-from pyqtgraph.Qt import VERSION_INFO
-from pyqtgraph.Qt import QtGui, QtCore
-import pyqtgraph as pg
-from libs.DateAxisItem import *
-
 import threading
+import asyncio
 import logging
 logging_levels = ["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"]
 
 from libs.radar_patient_source import RadarPatientSource
+from libs.radar_subject_cache import RadarSubjectCache
+from libs.radar_source_registry import RadarSourceRegistry
+from libs.radar_fleet_status import RadarFleetStatus
+from libs.radar_data_buffer import status_table, formatStamp, bisectSamples
+from libs.radar_sample_store import RadarSampleStore
+from libs.radar_poll_scheduler import RadarPollScheduler
 
-global running, raw_api_data, monitor_data, subjects, subject_sources
+global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm
 
 sourceTypes = ["ANDROID", "EMPATICA", "PEBBLE", "BIOVOTION"]
 sensorTypes = ["ACCELEROMETER", "BATTERY", "BLOOD_VOLUME_PULSE", "ELECTRODERMAL_ACTIVITY", "INTER_BEAT_INTERVAL", "HEART_RATE", "THERMOMETER"]
@@ -48,20 +51,21 @@ methods = [
             "last_received_sample"
           ]
 
+# poll: poll period of a sensor with this (time) status, as multiple of the selected interval
 status_desc = {
-                "GOOD": {"priority": 1, "th_min": 0, "th_bat": 0.25, "color": "lightgreen"},
-                "OK": {"priority": 2, "th_min": 2, "th_bat": 0.10, "color": "moccasin"},
-                "WARNING": {"priority": 3, "th_min": 3, "th_bat": 0.05, "color": "orange"},
-                "CRITICAL": {"priority": 4, "th_min": 5, "th_bat": 0, "color": "red"},
-                "DISCONNECTED": {"priority": 0, "th_min": 10, "th_bat": -1, "color": "transparent"},
-                "N/A": {"priority": -1, "th_min": -1, "th_bat": -1, "color": "lightgrey"}
+                "GOOD": {"priority": 1, "th_min": 0, "th_bat": 0.25, "poll": 1, "color": "lightgreen"},
+                "OK": {"priority": 2, "th_min": 2, "th_bat": 0.10, "poll": 1, "color": "moccasin"},
+                "WARNING": {"priority": 3, "th_min": 3, "th_bat": 0.05, "poll": 2, "color": "orange"},
+                "CRITICAL": {"priority": 4, "th_min": 5, "th_bat": 0, "poll": 4, "color": "red"},
+                "DISCONNECTED": {"priority": 0, "th_min": 10, "th_bat": -1, "poll": 30, "color": "transparent"},
+                "N/A": {"priority": -1, "th_min": -1, "th_bat": -1, "poll": 1, "color": "lightgrey"}
               }
 
 max_data_buf = 60480 # 1 week
+store_prune_interval = 3600 # seconds between sample store prunes
 
 timedateformat = "%Y-%m-%d %H:%M:%S UTC "
 datastampformat = "%Y-%m-%dT%H:%M:%SZ"
-utcOffset = time.timezone - (time.daylight * 3600)
 
 
 def eprint(*args, **kwargs):
@@ -73,14 +77,25 @@ def thread_sleep(msec):
     if running: time.sleep(1)
 
 
+# the monitor thread only polls while its tab is shown, always in headless mode
+def monitor_active():
+  return args.headless or tab_widget.currentIndex() == 1
+
+# currently selected (stat, interval) of the monitor
+def monitor_selection():
+  if args.headless: return (args.stat, args.interval)
+  return (monitor_stat_select.value(), monitor_interval_select.value())
+
+
 def raw_api_callback(response):
-  global running, raw_api_data, monitor_data, subjects, subject_sources
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm
   logging.debug("[RAW] got response.")
   if args.verbose and args.verbose > 1: pprint(response)
   raw_api_data = response
 
-def monitor_callback(response):
-  global running, raw_api_data, monitor_data, subjects, subject_sources
+# query is the (stat, interval) the request was issued with
+def monitor_callback(response, query):
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm
   if args.verbose and args.verbose > 1: pprint(response)
 
   if response == '': return
@@ -88,27 +103,38 @@ def monitor_callback(response):
   try:
     patient_id = response["header"]["subjectId"]
     source_id = response["header"]["sourceId"]
-    source_id = source_id if source_id not in devices or not args.dev_replace or devices[source_id][args.dev_replace] == "" else devices[source_id][args.dev_replace]
+    hwm_key = (patient_id, source_id, response["header"]["sensor"])
+    source_id = device_name(source_id)
     sensor = response["header"]["sensor"]
     status = "N/A"
     samples = response["dataset"]
     last_sample = samples[len(samples)-1]
     last_stamp = last_sample["startDateTime"]
-  except TypeError as ex:
-    logging.warn("[MONITOR] TypeError in monitor_callback: " + str(ex))
+  except (TypeError, KeyError, IndexError) as ex:
+    logging.warn("[MONITOR] {} in monitor_callback: {}".format(type(ex).__name__, ex))
     return
 
-  monitor_data_rlock.acquire()
-
-  # find current data index
-  data_idx = monitor_data.index((patient_id,source_id))
-
-  monitor_data[data_idx].data_buf.replaceSamples(sensor, samples)
-
-  status = monitor_data[data_idx].getStatus(sensor)
-  logging.debug("[MONITOR] status of {} @ {}/{}: {}".format(sensor, patient_id, source_id, status))
-
-  monitor_data_rlock.release()
+  # find current source, it may have left the roster meanwhile
+  ps = monitor_data.get((patient_id,source_id))
+  if ps is None: return
+
+  # samples per overlap window at the interval the request was made with
+  overlap = max(1, int(args.api_overlap / intervals_to_sec[query[1]]))
+  with ps.lock:
+    # responses to requests of a previous stat/interval must not end up in the buffers cleared for the new one,
+    # monitor_cycle_start changes monitor_query before it takes the source locks to clear them
+    if tuple(query) != monitor_query:
+      logging.debug("[MONITOR] dropped {} @ {}/{} of previous query {}".format(sensor, patient_id, source_id, query))
+      return
+    changed = ps.data_buf.mergeSamples(sensor, samples, overlap=overlap)
+    monitor_hwm[hwm_key] = ps.data_buf.getLastStamp(sensor)
+    monitor_fleet.update((patient_id,source_id), sensor, ps.data_buf.getLastStamp(sensor), ps.data_buf.getLastValue(sensor) if sensor == "BATTERY" else None)
+    status = ps.getStatus(sensor)
+  logging.debug("[MONITOR] status of {} @ {}/{}: {}, changed: {}".format(sensor, patient_id, source_id, status, changed))
+
+  # persist everything from the first changed sample on
+  if monitor_store and changed:
+    monitor_store.put(hwm_key + tuple(query), samples[bisectSamples(samples, formatStamp(changed[0])):])
 
 
 # update a dictionary of deque buffers; add empty buffer if key not present, otherwise append
@@ -131,7 +157,7 @@ def replace_data_buf(buffer_dict, key, data, maxlen=None):
 
 
 def raw_api_thread(api_instance):
-  global running, raw_api_data, monitor_data, subjects, subject_sources
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm
 
   while(running):
     if (tab_widget.currentIndex() != 0):
@@ -178,61 +204,316 @@ def raw_api_thread(api_instance):
     thread_sleep(args.api_refresh)
 
 
+# logs buffer sizes and client statistics (connections, transfer, cache, rate limits)
+def monitor_log_stats():
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm, monitor_stats_stamp
+  monitor_stats_stamp = time.time()
+  if logging.getLogger().getEffectiveLevel() < 30: print()
+  logging.info("----------")
+  databuf_lengths = [ l for buf in [ ps.getBufferLengths() for ps in monitor_data ] for l in buf ]
+  logging.info("Monitor statistics, {} series scheduled.".format(len(monitor_scheduler)))
+  if len(databuf_lengths) > 0: logging.info("Databuffer size min:{} avg:{} max:{}".format(min(databuf_lengths), np.mean(databuf_lengths, dtype=np.int_), max(databuf_lengths)))
+  pool = api_instance.api_client.rest_client.pool_stats()["total"]
+  logging.info("Connections requests:{} new:{} reused:{} idle:{} coalesced:{}".format(pool["requests"], pool["connections"], pool["reused"], pool["idle"], api_instance.api_client.coalesced))
+  cache = api_instance.api_client.rest_client.cache
+  transfer = api_instance.api_client.rest_client.transfer_stats()
+  if transfer["responses"]: logging.info("Transfer responses:{responses} wire bytes:{wire_bytes} decoded bytes:{decoded_bytes}".format(**transfer))
+  if cache: logging.info("Response cache hits:{hits} revalidated:{revalidated} misses:{misses} bytes saved:{bytes_saved}".format(**cache.stats))
+  limits = rate_limit_stats()
+  if limits: logging.info("Rate limit waits " + " ".join( "{}:{:.1f}s".format(f, w) for f,w in sorted(limits.items()) ))
+  logging.info("----------")
+
+# housekeeping of the monitor every --api-refresh: logs statistics every --stats-interval,
+# resets all buffers if stat/interval changed since the last cycle, loads the store and exports.
+# returns the current (stat, interval) query
+def monitor_cycle_start(query):
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm, monitor_query
+  logging.debug("[MONITOR] cycle start, {} series scheduled".format(len(monitor_scheduler)))
+  if time.time() - monitor_stats_stamp >= args.stats_interval / 1000.: monitor_log_stats()
+
+  # a different stat/interval invalidates everything fetched so far
+  stat, interval = monitor_selection()
+  if query != (stat, interval):
+    monitor_query = (stat, interval)
+    if query is not None:
+      logging.info("stat/interval changed, starting full backfill.")
+      for ps in monitor_data:
+        with ps.lock:
+          for s in sensorTypes:
+            ps.data_buf.replaceSamples(s, [])
+            monitor_fleet.update((ps.subjectID,ps.sourceID), s, None)
+    monitor_hwm.clear()
+    monitor_store_loaded.clear()
+    monitor_scheduler.reset()
+  if monitor_store:
+    # a broken store must not stop polling, the series are then fully fetched from the api
+    try:
+      monitor_warm_start((stat, interval))
+    except Exception as ex:
+      logging.exception("[MONITOR] loading samples from {} failed: {}".format(args.store, ex))
+  if monitor_store: monitor_store_prune()
+  if args.export and time.time() - monitor_export_stamp >= args.export_interval / 1000.:
+    monitor_export((stat, interval))
+  return (stat, interval)
+
+# writes the changed series of all sources as memory-mappable files to --export
+def monitor_export(query):
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm, monitor_export_stamp
+  t = time.time()
+  written = sum( ps.exportSeries(args.export, {"stat": query[0], "interval": query[1]}) for ps in monitor_data )
+  monitor_export_stamp = t
+  if written > 0: logging.info("Exported {} series to {} in {:.3f}s".format(written, args.export, time.time() - t))
+
+# drops stored samples older than --store-retention, at most every store_prune_interval seconds
+def monitor_store_prune():
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm, monitor_store_prune_stamp
+  t = time.time()
+  if args.store_retention <= 0 or t - monitor_store_prune_stamp < store_prune_interval: return
+  monitor_store_prune_stamp = t
+  pruned = monitor_store.prune(formatStamp(t - args.store_retention * 86400))
+  if pruned > 0: logging.info("Dropped {} samples older than {} days from {} in {:.3f}s".format(pruned, args.store_retention, args.store, time.time() - t))
+
+# fills the buffers of series without data from the sample store,
+# the following requests then only fetch the gap since the last stored sample
+def monitor_warm_start(query):
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm
+  t = time.time()
+  loaded = 0
+  for sub in list(subject_sources.keys()):
+    for src in subject_sources[sub]:
+      ps = monitor_data.get((sub,device_name(src)))
+      if ps is None: continue
+      for s in sensorTypes:
+        key = (sub, src, s)
+        if key in monitor_store_loaded or key in monitor_hwm: continue
+        monitor_store_loaded.add(key)
+        samples = monitor_store.load(key + query, limit=max_data_buf)
+        if len(samples) == 0: continue
+        with ps.lock:
+          ps.data_buf.mergeSamples(s, samples)
+          monitor_hwm[key] = ps.data_buf.getLastStamp(s)
+          monitor_fleet.update((ps.subjectID,ps.sourceID), s, ps.data_buf.getLastStamp(s), ps.data_buf.getLastValue(s) if s == "BATTERY" else None)
+        loaded += len(samples)
+  if loaded > 0: logging.info("Loaded {} samples from {} in {:.3f}s".format(loaded, args.store, time.time() - t))
+
+# requests samples of one sensor, works with both DefaultApi (pass callback) and AsyncDefaultApi (returns coroutine)
+# full backfill first, afterwards only the window since the last received stamp
+def monitor_request(api, sub, src, sensor, stat, interval, **kwargs):
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm
+  hwm = monitor_hwm.get((sub, src, sensor))
+  if hwm is None or args.api_overlap < 0:
+    return api.get_samples_json(sensor, stat, interval, sub, src, **kwargs)
+  start, end = int((hwm - args.api_overlap) * 1000), int(time.time() * 1000)
+  return api.get_samples_within_window_json(sensor, stat, sub, src, interval, start, end, **kwargs)
+
+# poll period of one (subject, source, sensor) in seconds: the selected interval (at least --api-refresh),
+# scaled by the "poll" factor of the time status of its last sample
+def monitor_poll_period(key, query):
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm
+  sub, src, s = key
+  status = "N/A"
+  ps = monitor_data.get((sub,device_name(src)))
+  if ps is not None:
+    last = ps.data_buf.getMeta(s).last_epoch
+    if last is not None: status = status_table.timeStatus(max(time.time() - last, 0))
+  return max(intervals_to_sec[query[1]], args.api_refresh/1000.) * status_desc[status]["poll"]
+
+# (subjectId, sourceId, sensor) keys of all series of the current roster
+def monitor_series():
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm
+  return [ (sub,src,s) for sub in list(subject_sources.keys()) for src in subject_sources[sub] for s in sensorTypes ]
+
+# starts a new cycle (logging, stat/interval changes, store, export) every --api-refresh
+# and schedules the series of the current roster, returns the current (stat, interval) query
+def monitor_schedule(query, cycle):
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm
+  if time.time() - cycle[0] >= args.api_refresh/1000. or query is None:
+    query = monitor_cycle_start(query)
+    monitor_scheduler.sync(monitor_series())
+    cycle[0] = time.time()
+  return query
+
+# polls every (subject, source, sensor) when it is due, see monitor_poll_period,
+# limited to --api-rate requests per second overall
 def monitor_api_thread(api_instance):
-  global running, raw_api_data, monitor_data, subjects, subject_sources
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm
+  query = None
+  cycle = [0]
 
   while(running):
-    if (tab_widget.currentIndex() != 1):
+    if not monitor_active():
       thread_sleep(args.api_refresh)
       continue
 
     # always get list of subjects and sources first, everything else depends on this
     get_subjects_sources_info()
+    query = monitor_schedule(query, cycle)
+
+    key, wait = monitor_scheduler.pop()
+    if key is None:
+      time.sleep(min(wait, 0.5))
+      continue
+    monitor_scheduler.schedule(key, time.time() + monitor_poll_period(key, query))
 
     try:
-      cb = monitor_callback
-      if logging.getLogger().getEffectiveLevel() < 30: print()
-      logging.info("----------")
-      databuf_lengths = [ l for buf in [ ps.getBufferLengths() for ps in monitor_data ] for l in buf ]
-      logging.info("Starting API requests.")
-      if len(databuf_lengths) > 0: logging.info("Databuffer size min:{} avg:{} max:{}".format(min(databuf_lengths), np.mean(databuf_lengths, dtype=np.int_), max(databuf_lengths)))
-      logging.info("----------")
-      for sub in subject_sources.keys():
-        for src in subject_sources[sub]:
-          logging.info("query of sensorTypes @ {}/{}".format(sub, src))
-          for s in sensorTypes:
-            thread = api_instance.get_samples_json(s, monitor_stat_select.value(), monitor_interval_select.value(), sub, src, callback=cb)
-            time.sleep(args.api_interval/1000.)
-      #if args.api_refresh/1000. < 10: time.sleep(10 - (args.api_refresh/1000.)) #wait at least ten seconds for refresh
+      thread = monitor_request(api_instance, *key, *query, callback=functools.partial(monitor_callback, query=query))
+    except ApiException as e:
+      logging.error("Exception when calling DefaultApi->get_samples_json[]: %s\n" % e)
 
+# same as monitor_api_thread, but the requests run concurrently on one asyncio event loop,
+# limited to --api-workers requests in flight
+def monitor_api_async_thread(api_instance):
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm
+
+  async def request(api, sub, src, s, query):
+    try:
+      response = await monitor_request(api, sub, src, s, *query)
+      # parsing, merging and the store write block, run them off the loop so the other requests keep going
+      await asyncio.get_event_loop().run_in_executor(None, monitor_callback, response, query)
     except ApiException as e:
-      logging.error("Exception when calling DefaultApi->get_last_received_sample_json[]: %s\n" % e)
+      logging.error("Exception when calling AsyncDefaultApi->get_samples_json[]: %s\n" % e)
+    except Exception as e:
+      # timeouts, connection errors or a failing callback must not end up as unretrieved task exceptions
+      logging.error("[MONITOR] asynchronous request for {}/{}/{} failed: {}: {}".format(sub, src, s, type(e).__name__, e))
+
+  async def run():
+    query = None
+    cycle = [0]
+    tasks = set()
+    async with api_client.AsyncApiClient(host=api_instance.api_client.host, max_in_flight=max(1, args.api_workers)) as client:
+      api = api_client.AsyncDefaultApi(client)
+      while(running):
+        if not monitor_active():
+          await asyncio.sleep(args.api_refresh/1000.)
+          continue
+
+        # roster lookup and cycle start (store loads, export) are blocking, keep them off the loop
+        await asyncio.get_event_loop().run_in_executor(None, get_subjects_sources_info)
+        query = await asyncio.get_event_loop().run_in_executor(None, monitor_schedule, query, cycle)
+
+        key, wait = monitor_scheduler.pop()
+        if key is None:
+          await asyncio.sleep(min(wait, 0.5))
+          continue
+        monitor_scheduler.schedule(key, time.time() + monitor_poll_period(key, query))
+        task = asyncio.ensure_future(request(api, *key, query))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+      await asyncio.gather(*tasks, return_exceptions=True)
+
+  loop = asyncio.new_event_loop()
+  try:
+    loop.run_until_complete(run())
+  finally:
+    loop.run_until_complete(loop.shutdown_default_executor())
+    loop.close()
 
-    thread_sleep(args.api_refresh)
 
 
 
+# replace a source id (MAC) with the --dev-replace column of the device table, if available
+def device_name(src):
+  return src if src not in devices or not args.dev_replace or devices[src][args.dev_replace] == "" else devices[src][args.dev_replace]
 
 def get_subjects_sources_info():
-  global running, raw_api_data, monitor_data, subjects, subject_sources
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm, roster_version
   try:
-    subjects_tmp = api_instance.get_all_subjects_json(args.studyid)
-    for subject in subjects_tmp["subjects"]:
-      if subject["subjectId"] not in subjects: subjects.append(subject["subjectId"])
-      subject_sources[subject["subjectId"]] = [ source["id"] for source in subject["sources"] if source["type"] == "EMPATICA" ]
+    roster, version = subject_cache.get()
   except ApiException as e:
-    logging.error("Exception when calling DefaultApi->get_all_sources_json[]: %s\n" % e)
+    logging.error("Exception when calling DefaultApi->get_all_subjects_json[]: %s\n" % e)
+    return
 
-  # update monitor data
-  monitor_data_rlock.acquire()
-  for sub in sorted(subject_sources.keys()):
-    for src in subject_sources[sub]:
-      src = src if src not in devices or not args.dev_replace or devices[src][args.dev_replace] == "" else devices[src][args.dev_replace]
-      # check if entry already exists, skip if yes
-      if len(monitor_data) > 0 and (sub,src) in monitor_data: continue
-      monitor_data.append(RadarPatientSource(sub, src, bufferlen=max_data_buf))
-  monitor_data_rlock.release()
+  # nothing to do unless the roster changed
+  if version == roster_version: return
+
+  with monitor_data.lock:
+    if version != roster_version:
+      subject_sources = roster
+      subjects = list(roster.keys())
 
+      # update monitor data, existing sources are kept
+      keys = [ (sub,device_name(src)) for sub in roster for src in roster[sub] ]
+      monitor_data.sync(keys, lambda sub, src: RadarPatientSource(sub, src, bufferlen=max_data_buf, columnar=args.columnar))
+      monitor_fleet.sync(keys)
+
+      # forget the per-series state of removed sources, so a source that rejoins is fetched and loaded from scratch
+      series = set(monitor_series())
+      for k in [ k for k in list(monitor_hwm.keys()) if k not in series ]: monitor_hwm.pop(k, None)
+      for k in [ k for k in list(monitor_store_loaded) if k not in series ]: monitor_store_loaded.discard(k)
+      monitor_scheduler.sync(series)
+      roster_version = version
+
+
+
+# reads a device csv table, returns a dict of MAC -> device row (OrderedDict), the header row is stored as "header"
+def load_devices(path):
+  devices = dict()
+  with open(path, newline='') as csvfile:
+    csvreader = csv.reader(csvfile)
+    header = None
+    for row in csvreader:
+      if not header:
+        header = row
+        devices["header"] = header
+      else:
+        dev = collections.OrderedDict()
+        for h in range(len(header)):
+          dev[header[h]] = row[h]
+        devices[dev["MAC"]] = dev
+  return devices
+
+
+# logs a status summary of all sources, and appends one json line per source to --report-file
+def headless_report():
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm
+  now = datetime.datetime.utcnow()
+  fleet = monitor_fleet.evaluate()
+  codes = status_table.statusNames(fleet.codes)
+  prio = status_table.statusNames(fleet.prio)
+
+  report = []
+  for i,key in enumerate(fleet.keys):
+    d = monitor_data.get(key)
+    if d is None: continue
+    with d.lock:
+      sensors = {}
+      for j,s in enumerate(fleet.sensors):
+        meta = d.data_buf.getMeta(s)
+        sensors[s] = {"status": codes[i,j], "stamp": str(meta.last_stamp), "diff": str(meta.diff).split(".")[0], "samples": meta.num_samples}
+      report.append({"time": now.strftime(datastampformat), "subjectId": d.subjectID, "sourceId": d.sourceID, "status": prio[i], "battery": d.getBattery(), "sensors": sensors})
+
+  counts = collections.Counter([ r["status"] for r in report ])
+  logging.info("[HEADLESS] {} sources: {}".format(len(report), ", ".join([ "{}:{}".format(k, counts[k]) for k in status_desc.keys() if counts[k] > 0 ])))
+  for r in report:
+    if status_desc[r["status"]]["priority"] > 1:
+      logging.warning("[HEADLESS] {}/{} is {} (battery {})".format(r["subjectId"], r["sourceId"], r["status"], r["battery"]))
+
+  if args.report_file:
+    with open(args.report_file, "a") as f:
+      for r in report:
+        f.write(json.dumps(r) + "\n")
+
+# polls and reports without any GUI until interrupted
+def headless_main(api_instance):
+  global running
+  signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+  running = True
+  thread = threading.Thread( target=monitor_api_async_thread if args.api_asyncio else monitor_api_thread, args=(api_instance,), name="monitor_api" )
+  logging.info("starting thread " + thread.getName())
+  thread.start()
+  try:
+    while True:
+      time.sleep(args.report_interval/1000.)
+      headless_report()
+  except (KeyboardInterrupt, SystemExit):
+    pass
+  running = False
+  logging.info("joining thread " + thread.getName())
+  thread.join()
+  if args.export: monitor_export(monitor_selection())
+  api_instance.api_client.close()
+  if monitor_store: monitor_store.close()
+  logging.info("DONE")
 
 
 # recursively sorts a qt tree item and its children
@@ -270,14 +551,9 @@ def table_add_data(table, data, colcheck=[0], key=None):
   for i in range(table.columnCount()):
     table.item(row,i).setText(str(data[i]))
 
-# clears the table of rows, except those with indices in keep
-def table_clear(table, keep=[]):
-  for r in [ r for r in reversed(range(table.rowCount())) if r not in keep ]:
-    table.removeRow(r)
-
 
 def update_gui():
-  global running, raw_api_data, monitor_data, subjects, subject_sources
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm
 
   # update timedate label
   timedate_label.setText(api_instance.config.host + " | " + datetime.datetime.utcnow().strftime(timedateformat))
@@ -303,70 +579,66 @@ def update_gui():
   elif (tab_widget.currentIndex() == 1):
     sensor = monitor_sensor_select.value()
 
-    # filter monitor data
-    monitor_data_rlock.acquire()
-    dataset = [ copy.deepcopy(d) for d in monitor_data if monitor_view_all_check.isChecked() or status_desc[d.getPrioStatus()]["priority"] > 0 ]
-    monitor_data_rlock.release()
-
-    # clear table
-    contains = []
-    for d in dataset:
-      c = table_contains_data(monitor_table, [d.subjectID, d.sourceID], [0,1])
-      if c > -1: contains.append(c)
-    table_clear(monitor_table, contains)
+    # evaluate status of all sources at once, then take snapshots of the shown ones
+    fleet = monitor_fleet.evaluate()
+    prio = status_table.statusNames(fleet.prio)
+    dataset = []
+    for i in np.flatnonzero(monitor_fleet.filter(fleet, monitor_view_all_check.isChecked())):
+      d = monitor_data.get(fleet.keys[i])
+      if d is None: continue
+      with d.lock:
+        dataset.append(d.getSnapshot(sensor, prio_status=prio[i]))
 
     # add/replace data
+    rows = []
     for d in dataset:
       # populate value field
-      if d.getLastSample(sensor) is not None:
-        sample = d.getLastSample(sensor)["sample"]
-        if "value" in sample:
-          value = str(sample["value"])
+      value = "N/A"
+      if d.last_values is not None:
+        if sensor != "ACCELEROMETER":
+          value = str(d.last_values[0])
         else:
-          value = "x: {:.2} | y: {:.2} | z: {:.2}".format(sample["x"],sample["y"],sample["z"])
+          value = "x: {:.2} | y: {:.2} | z: {:.2}".format(*d.last_values)
 
       # get battery status
-      battery = d.getBattery()
+      battery = d.battery
       if not isinstance(battery, str): battery = "{:.2%}".format(battery)
 
       # add data
       # ["subjectId","sourceId","status","stamp","diff","battery","value"]
-      row = [d.subjectID, d.sourceID, d.getPrioStatus(), battery, d.getLastStamp(sensor), str(d.getDiff(sensor)).split(".")[0], value]
-      table_add_data(monitor_table, row, colcheck=[0,1])
-
-    # reset color of table cells
-    for item in monitor_table.findItems("*", QtCore.Qt.MatchWildcard):
-        item.setBackground(QtGui.QBrush(QtGui.QColor("transparent")))
-    # set color of status fields
-    for status in status_desc.keys():
-      for item in monitor_table.findItems(status, QtCore.Qt.MatchExactly):
-        item.setBackground(QtGui.QBrush(QtGui.QColor(status_desc[status]["color"])))
+      rows.append([d.subjectID, d.sourceID, d.prio_status, battery, d.last_stamp, str(d.diff).split(".")[0], value])
+    # only changed rows are redrawn, status colors come from the model
+    monitor_model.setRows(rows)
 
     # get selected item and draw line plot
-    sel = monitor_table.selectedItems()
+    sel = monitor_table.selectionModel().selectedIndexes()
     if len(sel) > 0 and monitor_update_check.isChecked():
-      sel_sub = monitor_table.item(sel[0].row(), 0).text()
-      sel_src = monitor_table.item(sel[0].row(), 1).text()
-      data = [ d for d in dataset if d == (sel_sub,sel_src) ][0]
-      if data.getLastSample(sensor) is not None:
-        # data samples to be plotted (y-axis)
-        data = data.getSamples(sensor)
-        # unix time stamps from the data samples (x-axis)
-        stamps = [ datetime.datetime.strptime(d["startDateTime"], datastampformat).timestamp() - utcOffset for d in data ]
-
-        # set plot x-axis range according to zoom level
-        if monitor_zoom_select.value() != "ALL":
-          monitor_plotw.setRange(xRange=[ int(time.time()-intervals_to_sec[monitor_zoom_select.value()]), int(time.time()) ])
+      sel_sub, sel_src = monitor_model.key(sel[0].row())
+      first = None
+      d = monitor_data.get((sel_sub,sel_src))
+      if d is not None:
+        with d.lock: first, last = d.data_buf.getFirstStamp(sensor), d.data_buf.getLastStamp(sensor)
+      if first is not None:
+        zoom = monitor_zoom_select.value()
+
+        # plot range according to zoom level (unix time stamps on the x-axis)
+        if zoom != "ALL":
+          xrange = [ int(time.time()-intervals_to_sec[zoom]), int(time.time()) ]
         else:
-          monitor_plotw.setRange(xRange=[ int(stamps[0]), int(stamps[-1]) ])
+          xrange = [ int(first), int(last) ]
+        monitor_plotw.setRange(xRange=xrange)
+
+        # decimate to a few points per horizontal pixel of the plot, cached until new data arrives
+        bins = max(int(monitor_plotw.width() * args.plot_density), 1)
+        with d.lock: curves = d.getPlotSeries(sensor, xrange[0], xrange[1], bins, zoom=zoom).curves
 
         # plot data, distinguish accelerometer (multi line) and others (single line)
         if sensor == "ACCELEROMETER":
-          monitor_plot_x.setData(x=stamps, y=[ d["sample"]["x"] for d in data ])
-          monitor_plot_y.setData(x=stamps, y=[ d["sample"]["y"] for d in data ])
-          monitor_plot_z.setData(x=stamps, y=[ d["sample"]["z"] for d in data ])
+          monitor_plot_x.setData(*curves["x"])
+          monitor_plot_y.setData(*curves["y"])
+          monitor_plot_z.setData(*curves["z"])
         else:
-          monitor_plot_x.setData(x=stamps, y=[ d["sample"]["value"] for d in data ])
+          monitor_plot_x.setData(*curves["value"])
           monitor_plot_y.clear()
           monitor_plot_z.clear()
 
@@ -375,7 +647,7 @@ def update_gui():
 
 
 if __name__=="__main__":
-  global running, raw_api_data, monitor_data, subjects, subject_sources
+  global running, raw_api_data, monitor_data, subjects, subject_sources, monitor_hwm
   class Formatter(argparse.ArgumentDefaultsHelpFormatter, argparse.RawTextHelpFormatter): pass
   cmdline = argparse.ArgumentParser(description="RADAR-CNS api monitor", formatter_class=Formatter)
 
@@ -386,13 +658,36 @@ if __name__=="__main__":
   cmdline.add_argument('-l', '--logging', metavar="LVL", type=str, default="INFO", help='set logging level\n', choices=logging_levels)
 
   cmdline.add_argument('-ar', '--api-refresh', metavar="MS", type=float, default=1000., help="api refresh rate (ms)\n")
-  cmdline.add_argument('-ai', '--api-interval', metavar="MS", type=float, default=100., help="api interval rate (ms)\n")
+  cmdline.add_argument('--stats-interval', metavar="MS", type=float, default=60000., help="log buffer and api client statistics this often (ms)\n")
+  cmdline.add_argument('-ai', '--api-interval', metavar="MS", type=float, default=100., help="api interval rate (ms), the default request budget if --api-rate is not given\n")
+  cmdline.add_argument('--api-rate', metavar="REQ/S", type=float, help="max monitor requests per second over all sources, overrides --api-interval\n")
+  cmdline.add_argument('-aw', '--api-workers', metavar="N", type=int, default=8, help="max number of concurrent api requests, 0 starts one thread per request\n")
+  cmdline.add_argument('--api-pool-size', metavar="N", type=int, default=32, help="max number of kept-alive connections to the api host\n")
+  cmdline.add_argument('--api-limit', nargs=3, metavar=("FAMILY", "REQ/S", "IN_FLIGHT"), action="append", help="rate limit for all requests to an endpoint family (/data, /source, /subject, /android or * for all others),\nshared by all threads, 0 is unlimited. Can be given several times\n")
+  cmdline.add_argument('--api-cache', help="cache subject, source and specification responses, revalidated with ETag/Last-Modified if the server sends them\n", action="store_true")
+  cmdline.add_argument('--api-no-compression', help="do not request gzip/deflate compressed responses\n", action="store_true")
+  cmdline.add_argument('--api-pool-block', help="wait for a free pooled connection instead of opening a throwaway one\n", action="store_true")
+  cmdline.add_argument('--api-timeout', metavar=("CONNECT","READ"), type=float, nargs=2, help="api connect and read timeouts (s)\n")
+  cmdline.add_argument('--api-asyncio', help="poll the monitor data from a single asyncio event loop (requires aiohttp)\n", action="store_true")
+  cmdline.add_argument('-ao', '--api-overlap', metavar="SEC", type=float, default=60., help="after the first full fetch, only request data since the last received stamp minus this overlap (s).\nA negative value always fetches the full history\n")
+  cmdline.add_argument('--subjects-ttl', metavar="SEC", type=float, default=60., help="refresh the subject/source list at most this often (s)\n")
+  cmdline.add_argument('--columnar', help="store monitor data in numpy ring buffers (grown on demand) instead of raw json samples\n", action="store_true")
+  cmdline.add_argument('--store', metavar="PATH", type=str, help="persist monitor samples to this SQLite file and reload them on start,\nso only samples newer than the stored ones are requested\n")
+  cmdline.add_argument('--store-retention', metavar="DAYS", type=float, default=7., help="drop stored samples older than this (on start and then hourly), 0 keeps all\n")
+  cmdline.add_argument('--export', metavar="DIR", type=str, help="periodically write the monitor series as memory-mappable numpy files with a json index to this directory\n(<DIR>/<subjectId>/<sourceId>/<sensor>.json, see libs/radar_series_file.py)\n")
+  cmdline.add_argument('--export-interval', metavar="MS", type=float, default=60000., help="minimum time between exports (ms)\n")
+
+  cmdline_headless_group = cmdline.add_argument_group('headless arguments')
+  cmdline_headless_group.add_argument('--headless', help="run without GUI, only poll the monitor data and report the source status\n", action="store_true")
+  cmdline_headless_group.add_argument('--report-interval', metavar="MS", type=float, default=60000., help="headless status report interval (ms)\n")
+  cmdline_headless_group.add_argument('--report-file', type=str, help="append headless status reports as json lines to this file\n")
 
   cmdline_gui_group = cmdline.add_argument_group('GUI arguments')
   cmdline_gui_group.add_argument('--title', type=str, default="RADAR-CNS api monitor", help="window title\n")
   cmdline_gui_group.add_argument('--invert-fbg-colors', help="invert fore/background colors\n", action="store_true")
   cmdline_gui_group.add_argument('-gr', '--gui-refresh', metavar="MS", type=float, default=1000., help="gui refresh rate (ms)\n")
   cmdline_gui_group.add_argument('-m', '--maximized', help="start window maximized\n", action="store_true")
+  cmdline_gui_group.add_argument('--plot-density', metavar="BINS", type=float, default=1., help="min/max bins per horizontal pixel of the monitor plot (2 points per bin)\n")
 
   cmdline_devices_group = cmdline.add_argument_group('device manipulation arguments')
   cmdline_devices_group.add_argument('-d', '--devices', type=str, help="csv file for importing device descriptions.\n")
@@ -423,27 +718,79 @@ if __name__=="__main__":
     logging.error("--dev-replace requires --devices!")
     sys.exit(1)
 
+  # gui libraries are only loaded if needed
+  if not args.headless:
+    from pyqtgraph.Qt import VERSION_INFO
+    from pyqtgraph.Qt import QtGui, QtCore
+    import pyqtgraph as pg
+    from libs.DateAxisItem import *
+    from libs.monitor_table_model import MonitorTableModel
+
   if args.version:
-    pg.systemInfo()
+    if args.headless: print("python {}, numpy {}".format(sys.version.split()[0], np.__version__))
+    else: pg.systemInfo()
     sys.exit(0)
 
-  if "PyQt5" not in VERSION_INFO:
+  if not args.headless and "PyQt5" not in VERSION_INFO:
     logging.error("requires PyQt5 bindings!")
     logging.error("bindings are: " + VERSION_INFO)
     sys.exit(1)
 
   running = False
   raw_api_data = dict()
-  monitor_data = list()
+  monitor_data = RadarSourceRegistry()
+  monitor_fleet = RadarFleetStatus(sensorTypes, status_table)
+  monitor_hwm = dict()
+  # (stat, interval) the buffers currently hold, set by monitor_cycle_start
+  monitor_query = None
+  monitor_store = None
+  monitor_store_loaded = set()
+  monitor_store_prune_stamp = 0
+  monitor_export_stamp = 0
+  monitor_stats_stamp = 0
+  monitor_scheduler = RadarPollScheduler(rate=args.api_rate or (1000./args.api_interval if args.api_interval > 0 else None))
   subjects = list()
   subject_sources = dict()
+  roster_version = None
   devices = dict()
 
   # create an instance of the API class
+  api_client.configuration.async_workers = args.api_workers or None
+  api_client.configuration.connection_pool_maxsize = args.api_pool_size
+  api_client.configuration.connection_pool_block = args.api_pool_block
+  api_client.configuration.response_cache = args.api_cache
+  if args.api_no_compression: api_client.configuration.accept_encoding = None
+  for family, rate, in_flight in args.api_limit or []:
+    api_client.configuration.rate_limits[family] = {"rate": float(rate) or None, "max_in_flight": int(in_flight) or None}
+  if args.api_timeout:
+    api_client.configuration.connect_timeout, api_client.configuration.read_timeout = args.api_timeout
   api_instance = api_client.DefaultApi()
   logging.info("RADAR-CNS API client @ {}".format(api_instance.config.host))
 
-  monitor_data_rlock = threading.RLock()
+  # local sample store for warm restarts, samples older than the retention are dropped on start and then hourly
+  if args.store:
+    monitor_store = RadarSampleStore(args.store)
+    logging.info("Sample store {}".format(args.store))
+    monitor_store_prune()
+
+  # subject/source roster shared by all threads
+  subject_cache = RadarSubjectCache(lambda: api_instance.get_all_subjects_json(args.studyid), ttl=args.subjects_ttl)
+
+  # load devices if file specified
+  devices_error = False
+  if args.devices:
+    try:
+      devices.update(load_devices(args.devices))
+    except:
+      logging.error("Exception while trying to import csv file {}!".format(args.devices))
+      devices_error = True
+
+  # get some api info
+  get_subjects_sources_info()
+
+  if args.headless:
+    headless_main(api_instance)
+    sys.exit(0)
 
   # Enable antialiasing for prettier plots
   pg.setConfigOptions(antialias=True)
@@ -490,30 +837,11 @@ if __name__=="__main__":
   devices_widget.setLayout(devices_layout)
   #devices_layout.addWidget(QtGui.QLabel("Coming soon..."),0,0)
 
-  # load devices if file specified
+  # show devices status
   if not args.devices:
     devices_layout.addWidget(QtGui.QLabel("Import a device csv table via the -d/--devices CLI flag."),0,0)
-  else:
-    try:
-      with open(args.devices, newline='') as csvfile:
-        csvreader = csv.reader(csvfile)
-        header = None
-        for row in csvreader:
-          if not header:
-            header = row
-            devices["header"] = header
-          else:
-            dev = collections.OrderedDict()
-            for h in range(len(header)):
-              dev[header[h]] = row[h]
-            devices[dev["MAC"]] = dev
-    except:
-      logging.error("Exception while trying to import csv file {}!".format(args.devices))
-      devices_layout.addWidget(QtGui.QLabel("Exception while trying to import {}".format(args.devices)),0,0)
-
-
-  # get some api info
-  get_subjects_sources_info()
+  elif devices_error:
+    devices_layout.addWidget(QtGui.QLabel("Exception while trying to import {}".format(args.devices)),0,0)
 
   #
   # RAW API TAB
@@ -641,8 +969,10 @@ if __name__=="__main__":
   monitor_layout.addWidget(monitor_interval_select,0,3)
 
   # add table for monitor overview
-  monitor_table = QtGui.QTableWidget(0,7)
-  monitor_table.setHorizontalHeaderLabels(["subjectId","sourceId","status","battery","stamp","diff","value"])
+  monitor_model = MonitorTableModel(["subjectId","sourceId","status","battery","stamp","diff","value"], status_desc)
+  monitor_table = QtGui.QTableView()
+  monitor_table.setModel(monitor_model)
+  monitor_table.setSelectionBehavior(QtGui.QAbstractItemView.SelectRows)
   monitor_table.horizontalHeader().setSectionResizeMode(QtGui.QHeaderView.ResizeToContents)
   monitor_layout.addWidget(monitor_table,1,0,1,4)
 
@@ -709,7 +1039,7 @@ if __name__=="__main__":
   threads = []
   try:
     threads.append(threading.Thread( target=raw_api_thread, args=(api_instance,), name="raw_api" ))
-    threads.append(threading.Thread( target=monitor_api_thread, args=(api_instance,), name="monitor_api" ))
+    threads.append(threading.Thread( target=monitor_api_async_thread if args.api_asyncio else monitor_api_thread, args=(api_instance,), name="monitor_api" ))
     for t in threads:
       logging.info("starting thread " + t.getName())
       t.start()
@@ -726,5 +1056,8 @@ if __name__=="__main__":
   for t in threads:
     logging.info("joining thread " + t.getName())
     t.join()
+  if args.export: monitor_export(monitor_selection())
+  api_instance.api_client.close()
+  if monitor_store: monitor_store.close()
 
   logging.info("DONE")